@@ -3,69 +3,263 @@ JWT verification for Supabase tokens.
 Supports HS256 (Legacy Secret), RS256, and ES256 (JWKS).
 """
 
-from datetime import datetime, timezone
-from jose import jwt, JWTError, jwk
+import asyncio
+import base64
+import hashlib
+import json
+from collections import OrderedDict
 import httpx
+import jwt as pyjwt
+from jwt import InvalidTokenError as JWTError
+import threading
 import time
+from typing import Any
 
-# Simple in-memory cache for JWKS keys
-_JWKS_CACHE = {}
+# Simple in-memory cache for JWKS keys: {kid: (alg, public key object)}
+_JWKS_CACHE: dict[str, tuple[str, Any]] = {}
 _JWKS_CACHE_TTL = 3600  # 1 hour
 _LAST_FETCH_TIME = 0
+_JWKS_LOCK = threading.Lock()  # Serializes refreshes; reads are lock-free
+_JWKS_ASYNC_LOCK = asyncio.Lock()  # Same role for the event-loop path (single-flight)
+_LAST_FORCED_FETCH = 0.0
+_JWKS_ETAG: str | None = None
+_JWKS_LAST_MODIFIED: str | None = None
+_JWKS_MAX_AGE = 0  # from the JWKS response's Cache-Control header
+_FORCED_COOLDOWN = 30.0  # seconds between unknown-kid reloads
 
-def get_signing_key(token: str, supabase_url: str):
+# Verified payloads keyed by SHA-256 of the token, so repeat requests skip signature checks
+_JWT_CACHE: "OrderedDict[bytes, dict]" = OrderedDict()
+_JWT_CACHE_MAX = 4096
+_JWT_CACHE_EXP_MARGIN = 5  # seconds; treat tokens this close to expiry as uncached
+_JWT_CACHE_LOCK = threading.Lock()
+# Clock skew tolerated between Supabase and this server for iat/exp checks
+_JWT_LEEWAY = 60  # seconds
+
+# Shared HTTP client so JWKS refreshes reuse pooled connections
+_JWKS_HTTP_CLIENT = httpx.Client(
+    timeout=5.0,
+    limits=httpx.Limits(max_keepalive_connections=5),
+)
+# Async counterpart used from request handlers so a JWKS fetch never blocks the loop
+_JWKS_ASYNC_CLIENT = httpx.AsyncClient(
+    timeout=5.0,
+    limits=httpx.Limits(max_keepalive_connections=5),
+)
+
+def _parse_max_age(cache_control: str | None) -> int:
+    """Extract max-age (seconds) from a Cache-Control header, 0 if absent."""
+    for directive in (cache_control or "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name.lower() == "max-age" and value.isdigit():
+            return int(value)
+    return 0
+
+
+def _jwks_ttl() -> float:
+    """Effective cache TTL, extended by the server's max-age when larger."""
+    return max(_JWKS_CACHE_TTL, _JWKS_MAX_AGE)
+
+
+def _jwks_request(supabase_url: str) -> tuple[str, dict[str, str]]:
     """
-    Get the signing key for a token (RS256/ES256) or return None.
-    fetches from JWKS endpoint.
+    Build the JWKS URL and conditional request headers.
+    Sends the previous ETag / Last-Modified so unchanged key sets come back as 304.
+    """
+    # remove trailing slash if present
+    base_url = supabase_url.rstrip('/')
+    jwks_url = f"{base_url}/auth/v1/.well-known/jwks.json"
+    
+    headers = {}
+    if _JWKS_ETAG:
+        headers["If-None-Match"] = _JWKS_ETAG
+    if _JWKS_LAST_MODIFIED:
+        headers["If-Modified-Since"] = _JWKS_LAST_MODIFIED
+    return jwks_url, headers
+
+
+def _apply_jwks_response(resp: httpx.Response) -> None:
+    """
+    Swap in a fresh key cache from a JWKS response.
+    Readers never see a partially-built dict because the new cache is
+    populated before being rebound.
     """
-    global _LAST_FETCH_TIME, _JWKS_CACHE
+    global _LAST_FETCH_TIME, _JWKS_CACHE, _JWKS_ETAG, _JWKS_LAST_MODIFIED, _JWKS_MAX_AGE
     
+    if resp.status_code == 304:
+        _LAST_FETCH_TIME = time.time()
+        return
+    
+    resp.raise_for_status()
+    keys = resp.json().get("keys", [])
+    
+    # Build key objects once here instead of re-parsing the JWK on every verify
+    new_cache = dict(_JWKS_CACHE)
+    for key_data in keys:
+        try:
+            signing_key = pyjwt.PyJWK(key_data)
+        except (pyjwt.PyJWKError, pyjwt.InvalidKeyError) as e:
+            print(f"Skipping unusable JWK {key_data.get('kid')}: {e}")
+            continue
+        new_cache[key_data["kid"]] = (signing_key.algorithm_name, signing_key.key)
+    
+    _JWKS_CACHE = new_cache
+    _JWKS_ETAG = resp.headers.get("etag")
+    _JWKS_LAST_MODIFIED = resp.headers.get("last-modified")
+    _JWKS_MAX_AGE = _parse_max_age(resp.headers.get("cache-control"))
+    _LAST_FETCH_TIME = time.time()
+
+
+def _update_jwks(supabase_url: str) -> None:
+    """Fetch the Supabase JWKS and update the key cache. Caller must hold _JWKS_LOCK."""
+    jwks_url, headers = _jwks_request(supabase_url)
+    _apply_jwks_response(_JWKS_HTTP_CLIENT.get(jwks_url, headers=headers))
+
+
+async def _refresh_jwks(supabase_url: str) -> None:
+    """Async variant of _update_jwks. Caller must hold _JWKS_ASYNC_LOCK."""
+    jwks_url, headers = _jwks_request(supabase_url)
+    _apply_jwks_response(await _JWKS_ASYNC_CLIENT.get(jwks_url, headers=headers))
+
+
+def prefetch_jwks(supabase_url: str) -> None:
+    """
+    Fetch the Supabase JWKS and populate the key cache.
+    Called at startup and by the background refresher so requests rarely hit the network.
+    """
+    with _JWKS_LOCK:
+        _update_jwks(supabase_url)
+
+
+async def refresh_jwks_periodically(supabase_url: str) -> None:
+    """Background loop that re-fetches the JWKS every effective cache TTL."""
+    while True:
+        await asyncio.sleep(_jwks_ttl())
+        try:
+            await asyncio.to_thread(prefetch_jwks, supabase_url)
+        except Exception as e:
+            print(f"Failed to refresh JWKS: {e}")
+
+
+def _jwks_is_stale() -> bool:
+    """Whether the cached key set has outlived its TTL."""
+    return time.time() - _LAST_FETCH_TIME > _jwks_ttl()
+
+
+def _forced_fetch_allowed() -> bool:
+    """Whether an unknown-kid reload is permitted under the cooldown."""
+    return time.time() - _LAST_FORCED_FETCH > _FORCED_COOLDOWN
+
+
+def _peek_header(token: str) -> dict:
+    """
+    Decode the JWT header segment without any validation.
+    Only `alg`/`kid` are needed here; the full decode does the real checks.
+    """
+    segment = token.split(".", 1)[0]
     try:
-        header = jwt.get_unverified_header(token)
-        kid = header.get("kid")
-        alg = header.get("alg")
+        header = json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+    except ValueError as e:
+        raise JWTError(f"Invalid header: {e}")
+    if not isinstance(header, dict):
+        raise JWTError("Invalid header: not a JSON object")
+    return header
+
+
+def _jwks_kid(token: str, header: dict | None) -> str | None:
+    """
+    The kid to look up in the JWKS for an RS256/ES256 token, or None for
+    tokens checked against the HS256 secret.
+    """
+    if header is None:
+        header = _peek_header(token)
+    
+    # Supabase uses RS256 or ES256
+    if header.get("alg") not in ["RS256", "ES256"]:
+        return None
+    
+    kid = header.get("kid")
+    if not kid:
+        raise JWTError("No 'kid' in header")
+    return kid
+
+
+def _claim_forced_fetch(kid: str) -> bool:
+    """
+    Whether to reload the JWKS for an unknown kid; claims the cooldown if so.
+    Unknown kids usually mean Supabase rotated keys; the cooldown stops bogus
+    kids from hammering the JWKS endpoint. Caller must hold the refresh lock.
+    """
+    global _LAST_FORCED_FETCH
+    if kid in _JWKS_CACHE or not _forced_fetch_allowed():
+        return False
+    _LAST_FORCED_FETCH = time.time()
+    return True
+
+
+def _cached_signing_key(kid: str) -> tuple[str, Any]:
+    signing_key = _JWKS_CACHE.get(kid)
+    if not signing_key:
+        raise JWTError(f"Public key not found for kid: {kid}")
+    return signing_key
+
+
+def get_signing_key(
+    token: str,
+    supabase_url: str,
+    header: dict | None = None
+) -> tuple[str, Any] | None:
+    """
+    Get the (algorithm, public key) pair for a token (RS256/ES256) or return None.
+    fetches from JWKS endpoint.
+    Pass an already-decoded `header` to avoid parsing it twice.
+    """
+    try:
+        kid = _jwks_kid(token, header)
+        if kid is None:
+            return None # Fallback to HS256 check
+        
+        # Refresh cache if needed, or once for an unknown kid
+        if _jwks_is_stale() or (kid not in _JWKS_CACHE and _forced_fetch_allowed()):
+            with _JWKS_LOCK:
+                # Re-check: a concurrent caller may have refreshed while we waited
+                if _jwks_is_stale() or _claim_forced_fetch(kid):
+                    try:
+                        _update_jwks(supabase_url)
+                    except Exception as e:
+                        # Fall back to the existing cache
+                        print(f"Failed to fetch JWKS: {e}")
         
-        # Supabase uses RS256 or ES256
-        if alg not in ["RS256", "ES256"]:
+        return _cached_signing_key(kid)
+
+    except JWTError as e:
+        raise e
+    except Exception as e:
+        print(f"Error getting signing key: {e}")
+        return None
+
+async def get_signing_key_async(
+    token: str,
+    supabase_url: str,
+    header: dict | None = None
+) -> tuple[str, Any] | None:
+    """
+    Async counterpart of get_signing_key for use inside request handlers.
+    Concurrent cache misses are coalesced into a single JWKS fetch.
+    """
+    try:
+        kid = _jwks_kid(token, header)
+        if kid is None:
             return None # Fallback to HS256 check
-            
-        if not kid:
-            raise JWTError("No 'kid' in header")
-
-        # Refresh cache if needed
-        now = time.time()
-        if now - _LAST_FETCH_TIME > _JWKS_CACHE_TTL or kid not in _JWKS_CACHE:
-            try:
-                # remove trailing slash if present
-                base_url = supabase_url.rstrip('/')
-                jwks_url = f"{base_url}/auth/v1/.well-known/jwks.json"
-                
-                # Fetch keys
-                with httpx.Client() as client:
-                     resp = client.get(jwks_url, timeout=5.0)
-                     resp.raise_for_status()
-                     keys = resp.json().get("keys", [])
-                     
-                     for key_data in keys:
-                         _JWKS_CACHE[key_data["kid"]] = key_data
-                     
-                     _LAST_FETCH_TIME = now
-            except Exception as e:
-                print(f"Failed to fetch JWKS: {e}")
-                # Fallback to existing cache if possible
-                pass
         
-        key_data = _JWKS_CACHE.get(kid)
-        if not key_data:
-             # Force refresh if key missing?
-             # For now, just error
-             raise JWTError(f"Public key not found for kid: {kid}")
-             
-        # Construct public key
-        # python-jose handles dict key_data automatically if passed to decode?
-        # Typically yes, but sometimes needs jwk.construct.
-        # But 'jwt.decode' key arg can be the key dict/PEM.
-        return key_data
+        if _jwks_is_stale() or (kid not in _JWKS_CACHE and _forced_fetch_allowed()):
+            async with _JWKS_ASYNC_LOCK:
+                if _jwks_is_stale() or _claim_forced_fetch(kid):
+                    try:
+                        await _refresh_jwks(supabase_url)
+                    except Exception as e:
+                        print(f"Failed to fetch JWKS: {e}")
+        
+        return _cached_signing_key(kid)
 
     except JWTError as e:
         raise e
@@ -73,51 +267,102 @@ def get_signing_key(token: str, supabase_url: str):
         print(f"Error getting signing key: {e}")
         return None
 
+
+async def close_jwks_clients() -> None:
+    """Close the JWKS HTTP clients (called on application shutdown)."""
+    _JWKS_HTTP_CLIENT.close()
+    await _JWKS_ASYNC_CLIENT.aclose()
+
+
+def _get_cached_payload(cache_key: bytes) -> dict | None:
+    """Return a copy of a cached payload if it is still comfortably valid."""
+    with _JWT_CACHE_LOCK:
+        payload = _JWT_CACHE.get(cache_key)
+        if payload is None:
+            return None
+        if payload["exp"] <= time.time() + _JWT_CACHE_EXP_MARGIN:
+            del _JWT_CACHE[cache_key]
+            return None
+        _JWT_CACHE.move_to_end(cache_key)
+    # Callers may annotate the payload (e.g. with a role), so hand out a copy
+    return dict(payload)
+
+
+def _cache_payload(cache_key: bytes, payload: dict) -> None:
+    """Store a verified payload, evicting the least recently used entries."""
+    if not isinstance(payload.get("exp"), (int, float)):
+        return
+    with _JWT_CACHE_LOCK:
+        _JWT_CACHE[cache_key] = dict(payload)
+        _JWT_CACHE.move_to_end(cache_key)
+        while len(_JWT_CACHE) > _JWT_CACHE_MAX:
+            _JWT_CACHE.popitem(last=False)
+
+
+def _decode_token(
+    token: str,
+    cache_key: bytes,
+    secret: str,
+    signing_key: tuple[str, Any] | None
+) -> dict:
+    """Verify the token against a resolved JWKS key, or the HS256 secret, and cache it."""
+    decode_key = secret
+    algorithms = ["HS256"]
+    
+    if signing_key:
+        key_alg, decode_key = signing_key
+        algorithms = [key_alg]
+
+    # Decode and verify the token
+    payload = pyjwt.decode(
+        token,
+        decode_key,
+        algorithms=algorithms,
+        leeway=_JWT_LEEWAY,
+        options={
+            "verify_signature": True,
+            "verify_exp": True,
+            "verify_iat": True,
+            "verify_aud": False,
+        }
+    )
+    
+    _cache_payload(cache_key, payload)
+    return payload
+
+
 def verify_supabase_jwt(token: str, secret: str, supabase_url: str) -> dict:
     """
     Verify a Supabase JWT token.
     Automatically handles RS256/ES256 (JWKS) and HS256 (Secret).
+    Successfully verified payloads are cached until shortly before they expire.
     """
+    cache_key = hashlib.sha256(token.encode()).digest()
+    cached = _get_cached_payload(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        # Check header algorithm
-        header = jwt.get_unverified_header(token)
-        alg = header.get("alg")
-        
-        decode_key = secret
-        algorithms = ["HS256"]
-        
-        if alg in ["RS256", "ES256"]:
-            key_data = get_signing_key(token, supabase_url)
-            if key_data:
-                # python-jose constructs key from dict automatically? 
-                # Let's ensure it works by passing the dict.
-                decode_key = key_data
-                algorithms = [alg]
-            else:
-                 # If we failed to get key for RS256/ES256, we can't verify.
-                 pass
-
-        # Decode and verify the token
-        payload = jwt.decode(
-            token,
-            decode_key,
-            algorithms=algorithms,
-            options={
-                "verify_signature": True,
-                "verify_exp": True,
-                "verify_iat": True,
-                "verify_aud": False,
-            }
-        )
-        
-        # Additional expiration check
-        exp = payload.get("exp")
-        if exp:
-            exp_datetime = datetime.fromtimestamp(exp, tz=timezone.utc)
-            if datetime.now(timezone.utc) >= exp_datetime:
-                raise JWTError("Token has expired")
-        
-        return payload
+        header = _peek_header(token)
+        signing_key = get_signing_key(token, supabase_url, header)
+        return _decode_token(token, cache_key, secret, signing_key)
+    except JWTError as e:
+        raise JWTError(f"Invalid token: {str(e)}")
+
+
+async def verify_supabase_jwt_async(token: str, secret: str, supabase_url: str) -> dict:
+    """
+    Same as verify_supabase_jwt, but any JWKS fetch is awaited instead of
+    blocking the event loop. Decoding itself stays synchronous (CPU only).
+    """
+    cache_key = hashlib.sha256(token.encode()).digest()
+    cached = _get_cached_payload(cache_key)
+    if cached is not None:
+        return cached
     
+    try:
+        header = _peek_header(token)
+        signing_key = await get_signing_key_async(token, supabase_url, header)
+        return _decode_token(token, cache_key, secret, signing_key)
     except JWTError as e:
         raise JWTError(f"Invalid token: {str(e)}")
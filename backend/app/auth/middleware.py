@@ -7,22 +7,21 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import httpx
 from typing import Optional, Dict, Any
-from jose import JWTError
 
-from app.auth.jwt import verify_supabase_jwt
-from app.config import get_settings
+from app.auth.jwt import verify_supabase_jwt, JWTError
+from app.config import get_settings, Settings
 
 security = HTTPBearer()
 
 def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    settings: Settings = Depends(get_settings)
 ) -> Dict[str, Any]:
     """
     Dependency to get current authenticated user from JWT token.
     Verifies the Supabase JWT token and returns the user payload.
     """
     try:
-        settings = get_settings()
         payload = verify_supabase_jwt(
             credentials.credentials, 
             settings.supabase_jwt_secret,
@@ -78,32 +77,46 @@ def require_role(required_role: str):
 require_host = require_role("host")
 require_student = require_role("student")
 
-async def refresh_user_session(token: str) -> Optional[Dict[str, Any]]:
+async def refresh_user_session(
+    token: str,
+    http_client: Optional[httpx.AsyncClient] = None
+) -> Optional[Dict[str, Any]]:
     """
     Refresh user session with Supabase.
     Useful for extending session lifetime or handling expired tokens.
+    Pass the shared client from `app.state.http_client` to reuse pooled connections.
     """
     try:
         settings = get_settings()
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.supabase_url}/auth/v1/token?grant_type=refresh_token",
-                headers={
-                    "apikey": settings.supabase_anon_key,
-                    "Authorization": f"Bearer {token}",
-                    "Content-Type": "application/json"
-                },
-                json={"refresh_token": token}
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            return None
+        if http_client is None:
+            async with httpx.AsyncClient() as client:
+                return await _post_refresh_token(client, settings, token)
+        return await _post_refresh_token(http_client, settings, token)
             
     except Exception as e:
         print(f"Session refresh error: {e}")
         return None
 
+async def _post_refresh_token(
+    client: httpx.AsyncClient,
+    settings,
+    token: str
+) -> Optional[Dict[str, Any]]:
+    """Issue the refresh-token request on the given client."""
+    response = await client.post(
+        f"{settings.supabase_url}/auth/v1/token?grant_type=refresh_token",
+        headers={
+            "apikey": settings.supabase_anon_key,
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        },
+        json={"refresh_token": token}
+    )
+    
+    if response.status_code == 200:
+        return response.json()
+    return None
+
 def validate_session_middleware(request):
     """
     Middleware function to validate session on each request.
@@ -31,6 +31,21 @@ class Settings(BaseSettings):
     # Code Execution
     code_timeout_seconds: int = 10
     code_memory_limit_mb: int = 256
+    # Docker Engine API version. Pinned so connecting skips the /version
+    # round-trip; 1.41 is Docker 20.10+. "auto" restores detection.
+    docker_api_version: str = "1.41"
+    # Path the Docker daemon sees for the sandbox directory, when it differs
+    # from the local one (e.g. Docker Desktop or a remote daemon)
+    docker_host_tmpdir: str | None = None
+    
+    # Cache (optional; leaderboard reads are cached in Redis when set)
+    redis_url: str | None = None
+    # Run AI evaluations on the arq worker (app/worker.py) instead of in-process.
+    # Requires redis_url and a running worker.
+    use_job_queue: bool = False
+    # Cache deterministic LLM completions (in-process, plus Redis when set).
+    # AI evaluation runs at temperature 0 while this is on.
+    llm_cache_enabled: bool = True
     
     # Environment
     environment: str = "development"
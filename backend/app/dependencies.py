@@ -3,31 +3,52 @@ Dependency injection for FastAPI.
 Provides Supabase client and current user extraction.
 """
 
-from typing import Annotated
+import asyncio
+import threading
+import time
+from functools import lru_cache
+from typing import Annotated, Any, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from supabase import create_client, Client
 
 from app.config import get_settings, Settings
-from app.auth.jwt import verify_supabase_jwt
+from app.auth.jwt import verify_supabase_jwt_async
 
 
 security = HTTPBearer()
 
+# Per-process cache of user roles: {user_id: (fetched_at, role)}
+_ROLE_CACHE: dict[str, tuple[float, str]] = {}
+_ROLE_TTL = 60.0  # seconds
+_ROLE_CACHE_MAX = 4096
+_ROLE_CACHE_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=2)
+def _supabase_client(url: str, key: str) -> Client:
+    """Shared Supabase client per (url, key), reusing its HTTP connection pool."""
+    return create_client(url, key)
+
 
 def get_supabase_client(
     settings: Annotated[Settings, Depends(get_settings)]
 ) -> Client:
     """Get Supabase client instance."""
-    return create_client(settings.supabase_url, settings.supabase_key)
+    return _supabase_client(settings.supabase_url, settings.supabase_key)
 
 
 def get_supabase_admin_client(
     settings: Annotated[Settings, Depends(get_settings)]
 ) -> Client:
     """Get Supabase client with service role for admin operations."""
-    return create_client(settings.supabase_url, settings.supabase_service_key)
+    return _supabase_client(settings.supabase_url, settings.supabase_service_key)
+
+
+def get_job_queue(request: Request) -> Optional[Any]:
+    """arq pool for background jobs, or None when evaluations run in-process."""
+    return getattr(request.app.state, "arq_pool", None)
 
 
 async def get_current_user(
@@ -41,7 +62,7 @@ async def get_current_user(
     token = credentials.credentials
     
     try:
-        payload = verify_supabase_jwt(token, settings.supabase_jwt_secret, settings.supabase_url)
+        payload = await verify_supabase_jwt_async(token, settings.supabase_jwt_secret, settings.supabase_url)
         return payload
     except Exception as e:
         raise HTTPException(
@@ -64,6 +85,28 @@ async def get_current_user_id(
     return user_id
 
 
+def _get_cached_role(user_id: str) -> str | None:
+    """Return the cached role for a user if it is still fresh."""
+    with _ROLE_CACHE_LOCK:
+        entry = _ROLE_CACHE.get(user_id)
+    if entry and time.monotonic() - entry[0] < _ROLE_TTL:
+        return entry[1]
+    return None
+
+
+def _cache_role(user_id: str, role: str) -> None:
+    """Remember a user's role, dropping expired entries when the cache is full."""
+    now = time.monotonic()
+    with _ROLE_CACHE_LOCK:
+        if len(_ROLE_CACHE) >= _ROLE_CACHE_MAX:
+            expired = [uid for uid, (ts, _) in _ROLE_CACHE.items() if now - ts >= _ROLE_TTL]
+            for uid in expired:
+                del _ROLE_CACHE[uid]
+            if len(_ROLE_CACHE) >= _ROLE_CACHE_MAX:
+                _ROLE_CACHE.clear()
+        _ROLE_CACHE[user_id] = (now, role)
+
+
 class RoleChecker:
     """Dependency class to check user roles."""
     
@@ -78,16 +121,19 @@ class RoleChecker:
         """Check if user has required role."""
         user_id = current_user.get("sub")
         
-        # Fetch user role from database
-        result = supabase.table("users").select("role").eq("id", user_id).single().execute()
-        
-        if not result.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        user_role = result.data.get("role")
+        user_role = _get_cached_role(user_id)
+        if user_role is None:
+            # Fetch user role from database
+            result = await asyncio.to_thread(supabase.table("users").select("role").eq("id", user_id).single().execute)
+            
+            if not result.data:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="User not found"
+                )
+            
+            user_role = result.data.get("role")
+            _cache_role(user_id, user_role)
         
         if user_role not in self.allowed_roles:
             raise HTTPException(
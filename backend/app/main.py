@@ -2,20 +2,42 @@
 FastAPI application entry point.
 """
 
+import asyncio
+import logging
+
+import httpx
+import orjson
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from app.auth import jwt
 from app.config import get_settings
+from app.services import groq_client
+from app.services.cache import get_cache
+from app.services.sandbox import ensure_images
+from app.services.sandbox_pool import shutdown_pools
 from app.routers import execution, submission, evaluation, leaderboard, generation
 
 settings = get_settings()
 
+logging.basicConfig(level=logging.INFO)
+
+
+class OrjsonResponse(JSONResponse):
+    """JSON responses serialized with orjson (FastAPI's ORJSONResponse is deprecated)."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
 app = FastAPI(
     title="CodeCraft API",
     description="Backend API for the AI-powered coding test platform",
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=OrjsonResponse,
 )
 
 # CORS middleware
@@ -23,10 +45,95 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists match what the frontend sends and avoid wildcard reflection
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["authorization", "content-type", "apikey"],
 )
 
+
+@app.on_event("startup")
+async def startup_http_client():
+    """Create the shared outbound HTTP client (e.g. Supabase session refresh)."""
+    app.state.http_client = httpx.AsyncClient(timeout=10.0)
+
+
+@app.on_event("startup")
+async def startup_prefetch_jwks():
+    """Warm the JWKS cache and keep it fresh off the request path."""
+    try:
+        await asyncio.to_thread(jwt.prefetch_jwks, settings.supabase_url)
+    except Exception as e:
+        print(f"JWKS prefetch failed: {e}")
+    app.state.jwks_refresh_task = asyncio.create_task(
+        jwt.refresh_jwks_periodically(settings.supabase_url)
+    )
+
+
+@app.on_event("startup")
+async def startup_job_queue():
+    """Connect to the arq queue if enabled; otherwise evaluations use BackgroundTasks."""
+    app.state.arq_pool = None
+    if settings.use_job_queue and settings.redis_url:
+        try:
+            from arq import create_pool
+            from arq.connections import RedisSettings
+            app.state.arq_pool = await create_pool(RedisSettings.from_dsn(settings.redis_url))
+        except Exception as e:
+            print(f"Job queue unavailable, running evaluations in-process: {e}")
+
+
+@app.on_event("startup")
+async def startup_sandbox_images():
+    """Clear orphaned sandbox containers and pull missing images before the first submission."""
+    try:
+        await asyncio.to_thread(ensure_images)
+    except Exception as e:
+        print(f"Sandbox image pull failed: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    """Close the shared outbound HTTP client."""
+    await app.state.http_client.aclose()
+
+
+@app.on_event("shutdown")
+async def shutdown_jwks_refresh():
+    """Stop the background JWKS refresher."""
+    app.state.jwks_refresh_task.cancel()
+
+
+@app.on_event("shutdown")
+async def shutdown_jwks_clients():
+    """Close the JWKS HTTP clients."""
+    await jwt.close_jwks_clients()
+
+
+@app.on_event("shutdown")
+async def shutdown_cache():
+    """Close the Redis connection pool, if one was opened."""
+    await get_cache(settings).close()
+
+
+@app.on_event("shutdown")
+async def shutdown_job_queue():
+    """Close the arq connection pool, if one was opened."""
+    if app.state.arq_pool is not None:
+        await app.state.arq_pool.aclose()
+
+
+@app.on_event("shutdown")
+async def shutdown_groq_client():
+    """Close the shared Groq connection pool."""
+    await groq_client.close_client()
+
+
+@app.on_event("shutdown")
+async def shutdown_sandbox_pool():
+    """Remove warm sandbox containers."""
+    await asyncio.to_thread(shutdown_pools)
+
+
 # Include routers
 app.include_router(execution.router, prefix="/api/v1", tags=["Code Execution"])
 app.include_router(submission.router, prefix="/api/v1", tags=["Submissions"])
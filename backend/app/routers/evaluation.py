@@ -2,6 +2,7 @@
 AI Evaluation API router.
 """
 
+import asyncio
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -13,6 +14,7 @@ from app.schemas.evaluation import (
     EvaluationResponse,
 )
 from app.services.ai_evaluator import evaluate_code_with_ai
+from app.services.cache import Cache, get_cache, invalidate_leaderboard
 from app.services.scorer import combine_scores
 
 
@@ -23,7 +25,8 @@ router = APIRouter()
 async def evaluate_submission(
     request: EvaluationRequest,
     current_user: Annotated[dict, Depends(get_current_user)],
-    supabase: Annotated[Client, Depends(get_supabase_client)]
+    supabase: Annotated[Client, Depends(get_supabase_client)],
+    cache: Annotated[Cache, Depends(get_cache)]
 ):
     """
     Perform AI evaluation on a submission.
@@ -31,8 +34,10 @@ async def evaluate_submission(
     Analyzes code quality, logical clarity, and complexity.
     Updates the submission with AI scores and combined final score.
     """
-    # Get submission
-    submission_result = supabase.table("submissions").select("*").eq("id", request.submission_id).single().execute()
+    # Get submission with its question (for the problem description) in one round-trip
+    submission_result = await asyncio.to_thread(supabase.table("submissions").select(
+        "*, questions(title, description, test_id)"
+    ).eq("id", request.submission_id).single().execute)
     
     if not submission_result.data:
         raise HTTPException(
@@ -41,13 +46,10 @@ async def evaluate_submission(
         )
     
     submission = submission_result.data
-    
-    # Get question for problem description
-    question_result = supabase.table("questions").select("title, description").eq("id", submission["question_id"]).single().execute()
+    question = submission.pop("questions", None)
     
     problem_description = "No description available"
-    if question_result.data:
-        question = question_result.data
+    if question:
         problem_description = f"{question['title']}\n\n{question['description']}"
     
     # Perform AI evaluation
@@ -69,20 +71,12 @@ async def evaluate_submission(
     )
     
     # Update submission with AI evaluation
-    ai_eval_dict = {
-        "code_quality_score": ai_evaluation.code_quality_score,
-        "logical_clarity_score": ai_evaluation.logical_clarity_score,
-        "time_complexity": ai_evaluation.time_complexity,
-        "space_complexity": ai_evaluation.space_complexity,
-        "overall_score": ai_evaluation.overall_score,
-        "suggestions": ai_evaluation.suggestions or [],
-        "justification": ai_evaluation.justification
-    }
+    ai_eval_dict = ai_evaluation.model_dump(mode="json")
     
-    update_result = supabase.table("submissions").update({
+    update_result = await asyncio.to_thread(supabase.table("submissions").update({
         "ai_evaluation": ai_eval_dict,
         "final_score": final_score
-    }).eq("id", request.submission_id).execute()
+    }).eq("id", request.submission_id).execute)
     
     if not update_result.data:
         raise HTTPException(
@@ -90,6 +84,10 @@ async def evaluate_submission(
             detail="Failed to update submission with AI evaluation"
         )
     
+    # final_score changed, so cached leaderboard pages are stale
+    if question:
+        await invalidate_leaderboard(cache, question["test_id"])
+    
     return EvaluationResponse(
         submission_id=request.submission_id,
         ai_evaluation=ai_evaluation,
@@ -13,7 +13,7 @@ from app.schemas.execution import (
     ExecutionSummary,
     TestcaseResult,
 )
-from app.services.sandbox import execute_testcase
+from app.services.sandbox import execute_all_testcases
 from app.config import get_settings, Settings
 
 
@@ -32,28 +32,27 @@ async def execute_code(
     Runs code in a sandboxed environment (Docker when available, local otherwise).
     Enforces timeout and memory limits.
     """
-    results: list[TestcaseResult] = []
     runtime_error = None
     
     # Use configured limits or request-specified limits (capped)
     timeout = min(request.timeout_seconds, settings.code_timeout_seconds)
     memory = min(request.memory_limit_mb, settings.code_memory_limit_mb)
     
-    for i, testcase in enumerate(request.testcases):
-        result = execute_testcase(
-            code=request.code,
-            language=request.language,
-            testcase=testcase,
-            testcase_index=i,
-            timeout_seconds=timeout,
-            memory_limit_mb=memory,
-            use_docker=True  # Try Docker, falls back to local
-        )
-        results.append(result)
-        
-        # Capture first runtime error
-        if result.error and not runtime_error:
+    # Testcases are independent, so they run concurrently; results keep input order
+    results: list[TestcaseResult] = await execute_all_testcases(
+        code=request.code,
+        language=request.language,
+        testcases=request.testcases,
+        timeout_seconds=timeout,
+        memory_limit_mb=memory,
+        use_docker=True  # Try Docker, falls back to local
+    )
+    
+    # Capture first runtime error
+    for result in results:
+        if result.error:
             runtime_error = result.error
+            break
     
     # Calculate summary
     passed = sum(1 for r in results if r.passed)
@@ -1,8 +1,12 @@
+import logging
+
 from fastapi import APIRouter, HTTPException, Depends
 from app.schemas.generation import GenerateQuestionRequest, GeneratedQuestionResponse
 from app.services.ai_generator import generate_question_with_ai
 from app.dependencies import get_current_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/generate",
     tags=["generation"],
@@ -15,12 +19,13 @@ async def generate_question(
     current_user = Depends(get_current_user) # Require auth
 ):
     try:
-        print(f"[DEBUG] Generating question: prompt='{request.prompt}', difficulty='{request.difficulty}', count={request.testcase_count}")
+        logger.debug(
+            "Generating question: prompt=%r difficulty=%r count=%s",
+            request.prompt, request.difficulty, request.testcase_count
+        )
         result = await generate_question_with_ai(request.prompt, request.difficulty, request.testcase_count)
-        print(f"[DEBUG] Generation successful")
+        logger.debug("Generation successful")
         return result
     except Exception as e:
-        import traceback
-        print(f"[ERROR] Generation failed: {type(e).__name__}: {str(e)}")
-        print(f"[ERROR] Traceback:\n{traceback.format_exc()}")
+        logger.exception("Generation failed: %s: %s", type(e).__name__, e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,6 +2,10 @@
 Integrity signals API router.
 """
 
+import asyncio
+import time
+from collections import defaultdict
+from operator import itemgetter
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -17,6 +21,8 @@ from app.schemas.integrity import (
     IntegrityEventResponse,
     IntegritySummary,
     IntegrityListItem,
+    EventCounts,
+    RiskLevel,
 )
 from app.services.risk_calculator import (
     calculate_risk_level,
@@ -26,6 +32,57 @@ from app.services.risk_calculator import (
 
 router = APIRouter()
 
+# Sort rank for risk levels in list views (high first)
+_RISK_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+# Short-lived memo of per-participant summaries for dashboard polling.
+# Events are append-only, so (participant_id, event count) identifies the event set.
+_RISK_CACHE: dict[tuple[str, int], tuple[float, tuple[EventCounts, RiskLevel, list[str]]]] = {}
+_RISK_CACHE_TTL = 5.0  # seconds
+_RISK_CACHE_MAX = 4096
+
+# Rows per integrity_events page; PostgREST caps responses at max-rows (1000 by default)
+_EVENTS_PAGE_SIZE = 1000
+
+
+def _summarize_events(
+    participant_id: str,
+    events: list[dict]
+) -> tuple[EventCounts, RiskLevel, list[str]]:
+    """Aggregate events and assess risk, reusing a fresh cached result if available."""
+    key = (participant_id, len(events))
+    now = time.monotonic()
+    
+    cached = _RISK_CACHE.get(key)
+    if cached and now - cached[0] < _RISK_CACHE_TTL:
+        return cached[1]
+    
+    event_counts = aggregate_events_to_counts(events)
+    risk_level, risk_factors = calculate_risk_level(event_counts)
+    summary = (event_counts, risk_level, risk_factors)
+    
+    if len(_RISK_CACHE) >= _RISK_CACHE_MAX:
+        _RISK_CACHE.clear()
+    _RISK_CACHE[key] = (now, summary)
+    return summary
+
+
+def _fetch_test_events(supabase: Client, test_id: str) -> list[dict]:
+    """
+    All integrity events for a test's participants, fetched page by page so
+    a large test isn't cut off at the server's row cap.
+    """
+    events: list[dict] = []
+    while True:
+        page = supabase.table("integrity_events").select(
+            "participant_id, event_type, participants!inner(test_id)"
+        ).eq("participants.test_id", test_id).order("id").range(
+            len(events), len(events) + _EVENTS_PAGE_SIZE - 1
+        ).execute().data or []
+        if not page:
+            return events
+        events.extend(page)
+
 
 @router.post("/integrity", response_model=IntegrityEventResponse)
 async def record_integrity_event(
@@ -41,7 +98,7 @@ async def record_integrity_event(
     # Verify participant exists and belongs to current user
     user_id = current_user.get("sub")
     
-    participant_result = supabase.table("participants").select("user_id").eq("id", request.participant_id).single().execute()
+    participant_result = await asyncio.to_thread(supabase.table("participants").select("user_id").eq("id", request.participant_id).single().execute)
     
     if not participant_result.data:
         raise HTTPException(
@@ -62,7 +119,7 @@ async def record_integrity_event(
         "metadata": request.metadata
     }
     
-    insert_result = supabase.table("integrity_events").insert(event_data).execute()
+    insert_result = await asyncio.to_thread(supabase.table("integrity_events").insert(event_data).execute)
     
     if not insert_result.data:
         raise HTTPException(
@@ -88,9 +145,9 @@ async def get_integrity_summary(
     Returns event counts and risk level assessment.
     """
     # Get participant with user info
-    participant_result = supabase.table("participants").select(
+    participant_result = await asyncio.to_thread(supabase.table("participants").select(
         "*, users(full_name)"
-    ).eq("id", participant_id).single().execute()
+    ).eq("id", participant_id).single().execute)
     
     if not participant_result.data:
         raise HTTPException(
@@ -102,15 +159,12 @@ async def get_integrity_summary(
     student_name = participant.get("users", {}).get("full_name", "Unknown")
     
     # Get all integrity events for this participant
-    events_result = supabase.table("integrity_events").select("*").eq("participant_id", participant_id).execute()
+    events_result = await asyncio.to_thread(supabase.table("integrity_events").select("*").eq("participant_id", participant_id).execute)
     
     events = events_result.data or []
     
-    # Aggregate events
-    event_counts = aggregate_events_to_counts(events)
-    
-    # Calculate risk level
-    risk_level, risk_factors = calculate_risk_level(event_counts)
+    # Aggregate events and calculate risk level
+    event_counts, risk_level, risk_factors = _summarize_events(participant_id, events)
     
     return IntegritySummary(
         participant_id=participant_id,
@@ -131,7 +185,7 @@ async def get_test_integrity(
     Get integrity signals for all participants in a test (host only).
     """
     # Verify host owns this test
-    test_result = supabase.table("tests").select("host_id").eq("id", test_id).single().execute()
+    test_result = await asyncio.to_thread(supabase.table("tests").select("host_id").eq("id", test_id).single().execute)
     
     if not test_result.data:
         raise HTTPException(
@@ -146,33 +200,36 @@ async def get_test_integrity(
         )
     
     # Get all participants with their events
-    participants_result = supabase.table("participants").select(
+    participants_result = await asyncio.to_thread(supabase.table("participants").select(
         "id, user_id, users(full_name)"
-    ).eq("test_id", test_id).execute()
+    ).eq("test_id", test_id).execute)
     
-    items = []
+    participants = participants_result.data or []
     
-    for participant in participants_result.data or []:
-        participant_id = participant["id"]
-        
-        # Get events for this participant
-        events_result = supabase.table("integrity_events").select("*").eq("participant_id", participant_id).execute()
-        
-        events = events_result.data or []
-        event_counts = aggregate_events_to_counts(events)
-        risk_level, _ = calculate_risk_level(event_counts)
+    # Fetch the test's events (filtered by a join, not an id list), then bucket in memory
+    events_by_participant: dict[str, list[dict]] = defaultdict(list)
+    if participants:
+        for event in await asyncio.to_thread(_fetch_test_events, supabase, test_id):
+            events_by_participant[event["participant_id"]].append(event)
+    
+    ranked_items: list[tuple[int, IntegrityListItem]] = []
+    
+    for participant in participants:
+        event_counts, risk_level, _ = _summarize_events(
+            participant["id"], events_by_participant[participant["id"]]
+        )
         
-        items.append(IntegrityListItem(
+        ranked_items.append((_RISK_ORDER.get(risk_level, 2), IntegrityListItem(
             student_id=participant["user_id"],
             student_name=participant.get("users", {}).get("full_name", "Unknown"),
             tab_switches=event_counts.tab_switches,
             copy_paste_attempts=event_counts.copy_paste_attempts + event_counts.paste_attempts,
             submission_timing_anomaly=False,  # Would need more context
             risk_level=risk_level
-        ))
+        )))
     
-    # Sort by risk level (high first)
-    risk_order = {"high": 0, "medium": 1, "low": 2}
-    items.sort(key=lambda x: risk_order.get(x.risk_level, 2))
+    # Sort by risk level (high first) on the rank computed above
+    ranked_items.sort(key=itemgetter(0))
+    items = [item for _, item in ranked_items]
     
     return items
@@ -4,7 +4,9 @@ Leaderboard API router.
 
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from pydantic import TypeAdapter
 from supabase import Client
 
 from app.dependencies import get_current_user, get_supabase_client
@@ -12,18 +14,29 @@ from app.schemas.leaderboard import (
     LeaderboardEntry,
     LeaderboardResponse,
 )
+from app.services.cache import (
+    LEADERBOARD_TTL,
+    Cache,
+    get_cache,
+    leaderboard_key,
+)
 
 
 router = APIRouter()
 
+# Validates a whole page in one pydantic-core call instead of one model per row
+_ENTRIES_ADAPTER = TypeAdapter(list[LeaderboardEntry])
+
 
 @router.get("/leaderboard/{test_id}", response_model=LeaderboardResponse)
 async def get_leaderboard(
     test_id: str,
     current_user: Annotated[dict, Depends(get_current_user)],
     supabase: Annotated[Client, Depends(get_supabase_client)],
+    cache: Annotated[Cache, Depends(get_cache)],
     limit: int = Query(default=50, ge=1, le=100),
-    offset: int = Query(default=0, ge=0)
+    offset: int = Query(default=0, ge=0),
+    after_rank: Optional[int] = Query(default=None, ge=0)
 ):
     """
     Get leaderboard for a test.
@@ -32,9 +45,18 @@ async def get_leaderboard(
     1. Primary: Total score (descending)
     2. Tiebreaker: Time taken (ascending)
     3. Secondary: Submission time (ascending)
+    
+    Pass the previous response's `next_cursor` as `after_rank` to page without
+    OFFSET; `offset` is still accepted for existing clients.
+    Pages are cached for a short TTL and invalidated when submissions land.
     """
+    cache_key = leaderboard_key(test_id, limit, offset, after_rank)
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
     # Verify test exists
-    test_result = supabase.table("tests").select("id, name").eq("id", test_id).single().execute()
+    test_result = supabase.table("tests").select("id").eq("id", test_id).limit(1).execute()
     
     if not test_result.data:
         raise HTTPException(
@@ -44,74 +66,45 @@ async def get_leaderboard(
     
     # Get participants with their submissions
     # Using raw query via leaderboard view for proper aggregation
-    leaderboard_result = supabase.table("leaderboard").select("*").eq("test_id", test_id).order("rank").range(offset, offset + limit - 1).execute()
+    # count="exact" returns the total alongside the page, so no second query is needed
+    query = supabase.table("leaderboard").select(
+        "rank, student_name, user_id, total_score, total_testcases_passed, total_testcases, time_taken_str, submitted_at",
+        count="exact"
+    ).eq("test_id", test_id).order("rank")
+    if after_rank is not None:
+        # Keyset pagination: continue after the last rank the client has seen
+        query = query.gt("rank", after_rank).limit(limit)
+    else:
+        query = query.range(offset, offset + limit - 1)
+    leaderboard_result = query.execute()
     
-    entries = []
-    for row in leaderboard_result.data or []:
-        # Format time taken
-        time_taken = row.get("time_taken")
-        if time_taken:
-            # Handle PostgreSQL interval format
-            if isinstance(time_taken, dict) and 'microseconds' in time_taken:
-                # PostgreSQL interval as dict
-                total_microseconds = time_taken.get('microseconds', 0)
-                total_seconds = total_microseconds / 1_000_000
-            elif hasattr(time_taken, 'total_seconds'):
-                # Python timedelta object
-                total_seconds = time_taken.total_seconds()
-            elif isinstance(time_taken, (int, float)):
-                # Direct seconds value
-                total_seconds = float(time_taken)
-            else:
-                # String format or unknown type
-                try:
-                    # Try to parse string format "HH:MM:SS" or "DD days, HH:MM:SS"
-                    if isinstance(time_taken, str):
-                        # Handle various interval string formats
-                        import re
-                        # Extract numeric values from interval string
-                        numbers = re.findall(r'(-?\d+)', time_taken)
-                        if len(numbers) >= 3:
-                            # Assume format is days, hours, minutes
-                            days, hours, minutes = map(int, numbers[:3])
-                            total_seconds = days * 86400 + hours * 3600 + minutes * 60
-                        elif len(numbers) >= 2:
-                            # Assume format is hours, minutes
-                            hours, minutes = map(int, numbers[:2])
-                            total_seconds = hours * 3600 + minutes * 60
-                        else:
-                            total_seconds = 0
-                    else:
-                        total_seconds = 0
-                except:
-                    total_seconds = 0
-            
-            hours, remainder = divmod(int(total_seconds), 3600)
-            minutes, seconds = divmod(remainder, 60)
-            time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-        else:
-            time_str = "00:00:00"
-        
-        entries.append(LeaderboardEntry(
-            rank=row["rank"],
-            student_name=row["student_name"],
-            user_id=row["user_id"],
-            total_score=row["total_score"] or 0,
-            testcases_passed=row["total_testcases_passed"] or 0,
-            total_testcases=row["total_testcases"] or 0,
-            time_taken=time_str,
-            submitted_at=row.get("submitted_at")
-        ))
+    entries = _ENTRIES_ADAPTER.validate_python([
+        {
+            "rank": row["rank"],
+            "student_name": row["student_name"],
+            "user_id": row["user_id"],
+            "total_score": row["total_score"] or 0,
+            "testcases_passed": row["total_testcases_passed"] or 0,
+            "total_testcases": row["total_testcases"] or 0,
+            "time_taken": row["time_taken_str"] or "00:00:00",
+            "submitted_at": row.get("submitted_at"),
+        }
+        for row in leaderboard_result.data or []
+    ])
     
-    # Get total count
-    count_result = supabase.table("leaderboard").select("*", count="exact").eq("test_id", test_id).execute()
-    total = count_result.count or len(entries)
+    total = leaderboard_result.count or len(entries)
     
-    return LeaderboardResponse(
+    response = LeaderboardResponse(
         test_id=test_id,
         entries=entries,
-        total_participants=total
+        total_participants=total,
+        next_cursor=entries[-1].rank if len(entries) == limit else None
     )
+    # Serialize once with orjson and send the same bytes that go into the cache,
+    # so hits and misses are byte-identical and the model isn't re-serialized
+    body = orjson.dumps(response.model_dump(mode="json"))
+    await cache.setex(cache_key, LEADERBOARD_TTL, body)
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/leaderboard/{test_id}/my-rank")
@@ -126,7 +119,9 @@ async def get_my_rank(
     user_id = current_user.get("sub")
     
     # Find user in leaderboard
-    result = supabase.table("leaderboard").select("*").eq("test_id", test_id).eq("user_id", user_id).single().execute()
+    result = supabase.table("leaderboard").select(
+        "rank, total_score, total_testcases_passed, total_testcases, time_taken_str"
+    ).eq("test_id", test_id).eq("user_id", user_id).limit(1).execute()
     
     if not result.data:
         return {
@@ -134,50 +129,7 @@ async def get_my_rank(
             "message": "You have not submitted any solutions yet"
         }
     
-    row = result.data
-    
-    time_taken = row.get("time_taken")
-    if time_taken:
-        # Handle PostgreSQL interval format
-        if isinstance(time_taken, dict) and 'microseconds' in time_taken:
-            # PostgreSQL interval as dict
-            total_microseconds = time_taken.get('microseconds', 0)
-            total_seconds = total_microseconds / 1_000_000
-        elif hasattr(time_taken, 'total_seconds'):
-            # Python timedelta object
-            total_seconds = time_taken.total_seconds()
-        elif isinstance(time_taken, (int, float)):
-            # Direct seconds value
-            total_seconds = float(time_taken)
-        else:
-            # String format or unknown type
-            try:
-                # Try to parse string format "HH:MM:SS" or "DD days, HH:MM:SS"
-                if isinstance(time_taken, str):
-                    # Handle various interval string formats
-                    import re
-                    # Extract numeric values from interval string
-                    numbers = re.findall(r'(-?\d+)', time_taken)
-                    if len(numbers) >= 3:
-                        # Assume format is days, hours, minutes
-                        days, hours, minutes = map(int, numbers[:3])
-                        total_seconds = days * 86400 + hours * 3600 + minutes * 60
-                    elif len(numbers) >= 2:
-                        # Assume format is hours, minutes
-                        hours, minutes = map(int, numbers[:2])
-                        total_seconds = hours * 3600 + minutes * 60
-                    else:
-                        total_seconds = 0
-                else:
-                    total_seconds = 0
-            except:
-                total_seconds = 0
-        
-        hours, remainder = divmod(int(total_seconds), 3600)
-        minutes, seconds = divmod(remainder, 60)
-        time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-    else:
-        time_str = "00:00:00"
+    row = result.data[0]
     
     return {
         "ranked": True,
@@ -185,5 +137,5 @@ async def get_my_rank(
         "total_score": row["total_score"] or 0,
         "testcases_passed": row["total_testcases_passed"] or 0,
         "total_testcases": row["total_testcases"] or 0,
-        "time_taken": time_str
+        "time_taken": row["time_taken_str"] or "00:00:00"
     }
@@ -2,7 +2,8 @@
 Submission API router.
 """
 
-from typing import Annotated
+import asyncio
+from typing import Annotated, Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from supabase import Client
@@ -10,6 +11,7 @@ from supabase import Client
 from app.dependencies import (
     get_current_user,
     get_current_user_id,
+    get_job_queue,
     get_supabase_client,
     get_supabase_admin_client,
     require_host,
@@ -21,87 +23,95 @@ from app.schemas.submission import (
     SubmissionListItem,
 )
 from app.schemas.execution import TestcaseInput
-from app.services.sandbox import execute_testcase
+from app.services.sandbox import execute_testcase_async
 from app.services.scorer import calculate_score, combine_scores
-from app.services.ai_evaluator import evaluate_code_with_ai
-from app.services.complexity_analyzer import analyze_complexity
+from app.services.cache import Cache, get_cache, invalidate_leaderboard
+from app.services.question_cache import get_question_for_participant
 from app.config import get_settings, Settings
 
 
 router = APIRouter()
 
-async def run_evaluation_task(submission_id: str, supabase: Client):
+async def run_evaluation_task(
+    submission_id: str,
+    code: str,
+    language: str,
+    title: str,
+    description: str,
+    testcases_passed: int,
+    total_testcases: int,
+    rule_based_score: float,
+    test_id: str,
+    supabase: Client,
+    cache: Cache
+):
     """
     Background task to run AI evaluation and update submission.
+    Everything it needs is handed over by submit_solution, so the only
+    database work is the final update.
     """
+    # Imported here so workers that never evaluate don't load the LLM client
+    from app.services.ai_evaluator import evaluate_code_with_ai
+    from app.services.complexity_analyzer import analyze_complexity
+    
     try:
-        # Get submission details
-        sub_res = supabase.table("submissions").select("*").eq("id", submission_id).single().execute()
-        if not sub_res.data:
-            return
-        
-        submission = sub_res.data
-        
-        # Get question details for description
-        q_res = supabase.table("questions").select("title, description").eq("id", submission["question_id"]).single().execute()
-        description = "No description"
-        if q_res.data:
-            description = f"{q_res.data['title']}\n\n{q_res.data['description']}"
+        problem_description = f"{title}\n\n{description}"
             
         # Run static complexity analysis first
-        complexity_analysis = analyze_complexity(submission["code"])
+        complexity_analysis = analyze_complexity(code)
         
         # Run AI Eval
         ai_eval = await evaluate_code_with_ai(
-            code=submission["code"],
-            language=submission["language"],
-            problem_description=description,
-            testcases_passed=submission["testcases_passed"],
-            total_testcases=submission["total_testcases"]
+            code=code,
+            language=language,
+            problem_description=problem_description,
+            testcases_passed=testcases_passed,
+            total_testcases=total_testcases
         )
         
-        # Override complexity values from static analysis if AI returned 'Unknown'
-        if ai_eval.time_complexity == "Unknown":
-            ai_eval.time_complexity = complexity_analysis["time_complexity"]
-        if ai_eval.space_complexity == "Unknown":
-            ai_eval.space_complexity = complexity_analysis["space_complexity"]
+        # Override complexity values from static analysis if AI returned 'Unknown'.
+        # Copied rather than assigned: fallback evaluations are shared instances.
+        overrides = {
+            field: complexity_analysis[field]
+            for field in ("time_complexity", "space_complexity")
+            if getattr(ai_eval, field) == "Unknown"
+        }
+        if overrides:
+            ai_eval = ai_eval.model_copy(update=overrides)
         
         # Calculate Final Score
         final_score = combine_scores(
-            rule_based_score=submission["rule_based_score"],
+            rule_based_score=rule_based_score,
             ai_score=ai_eval.overall_score,
             rule_weight=0.7,
             ai_weight=0.3
         )
         
-        ai_data = {
-            "code_quality_score": ai_eval.code_quality_score,
-            "logical_clarity_score": ai_eval.logical_clarity_score,
-            "time_complexity": ai_eval.time_complexity,
-            "space_complexity": ai_eval.space_complexity,
-            "overall_score": ai_eval.overall_score,
-            "suggestions": ai_eval.suggestions or [],
-            "justification": ai_eval.justification
-        }
+        ai_data = ai_eval.model_dump(mode="json")
         
         # Update DB
-        supabase.table("submissions").update({
+        await asyncio.to_thread(supabase.table("submissions").update({
             "ai_evaluation": ai_data,
             "final_score": final_score
-        }).eq("id", submission_id).execute()
+        }).eq("id", submission_id).execute)
+        
+        # final_score changed, so cached leaderboard pages are stale
+        await invalidate_leaderboard(cache, test_id)
         
     except Exception as e:
         print(f"Background evaluation failed: {e}")
 
 
 @router.post("/submit", response_model=SubmissionResponse)
-def submit_solution(
+async def submit_solution(
     request: SubmissionRequest,
     background_tasks: BackgroundTasks,
     current_user: Annotated[dict, Depends(get_current_user)],
     user_id: Annotated[str, Depends(get_current_user_id)],
     supabase: Annotated[Client, Depends(get_supabase_admin_client)],
-    settings: Annotated[Settings, Depends(get_settings)]
+    settings: Annotated[Settings, Depends(get_settings)],
+    cache: Annotated[Cache, Depends(get_cache)],
+    job_queue: Annotated[Optional[Any], Depends(get_job_queue)]
 ):
     """
     Submit a solution for evaluation.
@@ -110,82 +120,75 @@ def submit_solution(
     Triggers AI evaluation in background.
     """
     try:
-        # Get question details
-        question_result = supabase.table("questions").select("*").eq("id", request.question_id).limit(1).execute()
+        # Get question, all testcases (including hidden) and participant in one round-trip
+        lookup = await asyncio.to_thread(get_question_for_participant, request.question_id, user_id, supabase)
         
-        if not question_result.data or len(question_result.data) == 0:
+        if not lookup:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Question not found"
             )
         
-        question = question_result.data[0]
+        question, testcases, participant = lookup
         
-        # Get participant
-        participant_result = supabase.table("participants").select("*").eq("user_id", user_id).eq("test_id", question["test_id"]).limit(1).execute()
-        
-        if not participant_result.data or len(participant_result.data) == 0:
+        if not participant:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You are not a participant in this test. Please join the test first."
             )
         
-        participant = participant_result.data[0]
-        
-        # Get all testcases (including hidden)
-        testcases_result = supabase.table("testcases").select("*").eq("question_id", request.question_id).order("order_index").execute()
-        
-        testcases = testcases_result.data or []
-        
         if not testcases:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No testcases found for this question"
             )
         
-        # Execute against all testcases
-        results = []
-        total_time_ms = 0
-        max_memory_mb = 0
+        # Execute against all testcases concurrently and aggregate as each run
+        # finishes, so per-testcase outputs aren't held once they're counted
+        passed = 0
+        total = len(testcases)
+        total_time_ms = 0.0
+        max_memory_mb = 0.0
         runtime_error = None
+        runtime_error_index = total
         
-        for i, tc in enumerate(testcases):
-            testcase_input = TestcaseInput(
-                input=tc["input"],
-                expected_output=tc["expected_output"]
-            )
-            
-            result = execute_testcase(
+        for next_result in asyncio.as_completed([
+            execute_testcase_async(
                 code=request.code,
                 language=request.language,
-                testcase=testcase_input,
+                testcase=TestcaseInput(
+                    input=tc["input"],
+                    expected_output=tc["expected_output"]
+                ),
                 testcase_index=i,
                 timeout_seconds=settings.code_timeout_seconds,
                 memory_limit_mb=settings.code_memory_limit_mb,
                 use_docker=True
             )
-            
-            results.append(result)
+            for i, tc in enumerate(testcases)
+        ]):
+            result = await next_result
+            passed += result.passed
             total_time_ms += result.execution_time_ms
             max_memory_mb = max(max_memory_mb, result.memory_used_mb)
             
-            if result.error and not runtime_error:
+            # Runs finish out of order; report the error from the earliest testcase
+            if result.error and result.testcase_index < runtime_error_index:
                 runtime_error = result.error
+                runtime_error_index = result.testcase_index
         
         # Calculate score
-        passed = sum(1 for r in results if r.passed)
-        total = len(results)
+        avg_time_ms = total_time_ms / total if total else 0.0
         
         scoring_result = calculate_score(
             testcases_passed=passed,
             total_testcases=total,
             question_points=question.get("points", 100),
-            execution_time_ms=total_time_ms / len(results) if results else 0,
+            execution_time_ms=avg_time_ms,
             memory_used_mb=max_memory_mb
         )
         
         # Format for display
-        avg_time_ms = total_time_ms / len(results) if results else 0
         execution_time = f"{avg_time_ms:.0f}ms"
         memory_used = f"{max_memory_mb:.1f}MB"
         
@@ -204,7 +207,7 @@ def submit_solution(
             "runtime_error": runtime_error,
         }
         
-        insert_result = supabase.table("submissions").insert(submission_data).execute()
+        insert_result = await asyncio.to_thread(supabase.table("submissions").insert(submission_data).execute)
         
         if not insert_result.data:
             raise HTTPException(
@@ -215,15 +218,33 @@ def submit_solution(
         submission = insert_result.data[0]
         
         if request.is_final:
-            supabase.table("participants").update({
+            await asyncio.to_thread(supabase.table("participants").update({
                 "status": "submitted",
                 "submitted_at": "now()"
-            }).eq("id", participant["id"]).execute()
+            }).eq("id", participant["id"]).execute)
 
-        # Trigger AI Evaluation Background Task
-        # Note: We pass original supabase (admin) client might be safer or not?
-        # Typically passing client is fine.
-        background_tasks.add_task(run_evaluation_task, submission["id"], supabase)
+        background_tasks.add_task(invalidate_leaderboard, cache, question["test_id"])
+        
+        # Trigger AI Evaluation: on the arq worker when enabled, else in-process
+        evaluation_args = {
+            "submission_id": submission["id"],
+            "code": request.code,
+            "language": request.language,
+            "title": question["title"],
+            "description": question["description"],
+            "testcases_passed": passed,
+            "total_testcases": total,
+            "rule_based_score": scoring_result.final_score,
+            "test_id": question["test_id"],
+        }
+        queued = False
+        if job_queue is not None:
+            try:
+                queued = await job_queue.enqueue_job("run_evaluation", **evaluation_args) is not None
+            except Exception as e:
+                print(f"Failed to enqueue evaluation, running in-process: {e}")
+        if not queued:
+            background_tasks.add_task(run_evaluation_task, supabase=supabase, cache=cache, **evaluation_args)
         
         return SubmissionResponse(
             submission_id=submission["id"],
@@ -255,7 +276,7 @@ def get_submissions(
     Get all submissions for a test (host only).
     """
     # Verify host owns this test
-    test_result = supabase.table("tests").select("host_id").eq("id", test_id).single().execute()
+    test_result = supabase.table("tests").select("host_id").eq("id", test_id).limit(1).execute()
     
     if not test_result.data:
         raise HTTPException(
@@ -263,15 +284,17 @@ def get_submissions(
             detail="Test not found"
         )
     
-    if test_result.data["host_id"] != current_user.get("sub"):
+    if test_result.data[0]["host_id"] != current_user.get("sub"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this test"
         )
     
-    # Get submissions with participant and user info including timing
+    # Get submissions with participant and user info including timing.
+    # Only list-view columns: code and ai_evaluation can be large and are unused here.
     submissions_result = supabase.table("submissions").select(
-        "*, participants!inner(user_id, started_at, submitted_at, users(full_name))"
+        "id, language, final_score, testcases_passed, total_testcases, submitted_at, execution_time, memory_used, "
+        "participants!inner(user_id, started_at, submitted_at, users(full_name))"
     ).eq("participants.test_id", test_id).execute()
     
     submissions = []
@@ -307,7 +330,7 @@ def get_submission_detail(
     Get detailed submission info.
     Students can view their own, hosts can view any in their tests.
     """
-    result = supabase.table("submissions").select("*").eq("id", submission_id).single().execute()
+    result = supabase.table("submissions").select("*").eq("id", submission_id).limit(1).execute()
     
     if not result.data:
         raise HTTPException(
@@ -315,7 +338,7 @@ def get_submission_detail(
             detail="Submission not found"
         )
     
-    submission = result.data
+    submission = result.data[0]
     
     return SubmissionDetail(
         id=submission["id"],
@@ -2,8 +2,27 @@
 Pydantic schemas for code execution.
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional
+import json
+from functools import cached_property, lru_cache
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, Optional
+
+
+# Upper bound on submitted source size (characters); rejected at validation time
+MAX_CODE_LENGTH = 200_000
+
+
+@lru_cache(maxsize=1024)
+def _parse_expected(text: str) -> tuple[bool, Any]:
+    """
+    (True, value) if text is JSON, else (False, None). Cached because every
+    submission to a question compares against the same expected outputs.
+    The value is shared between callers and must not be mutated.
+    """
+    try:
+        return True, json.loads(text)
+    except (ValueError, RecursionError):
+        return False, None
 
 
 class TestcaseInput(BaseModel):
@@ -11,10 +30,16 @@ class TestcaseInput(BaseModel):
     input: str = Field(..., description="Input data for the testcase")
     expected_output: str = Field(..., description="Expected output")
 
+    @cached_property
+    def parsed_expected(self) -> tuple[str, bool, Any]:
+        """(stripped expected output, is JSON, parsed value), computed once per testcase."""
+        expected = self.expected_output.strip()
+        return (expected, *_parse_expected(expected))
+
 
 class ExecutionRequest(BaseModel):
     """Request model for code execution."""
-    code: str = Field(..., description="Source code to execute")
+    code: str = Field(..., min_length=1, max_length=MAX_CODE_LENGTH, description="Source code to execute")
     language: str = Field(..., pattern="^(python|cpp|java)$", description="Programming language")
     testcases: list[TestcaseInput] = Field(..., min_length=1, description="Testcases to run")
     timeout_seconds: int = Field(default=10, ge=1, le=30, description="Execution timeout")
@@ -23,6 +48,8 @@ class ExecutionRequest(BaseModel):
 
 class TestcaseResult(BaseModel):
     """Result of a single testcase execution."""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     testcase_index: int
     passed: bool
     actual_output: str
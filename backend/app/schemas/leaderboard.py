@@ -3,12 +3,14 @@ Pydantic schemas for leaderboard.
 """
 
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 
 
 class LeaderboardEntry(BaseModel):
     """Single leaderboard entry."""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     rank: int
     student_name: str
     user_id: str
@@ -24,6 +26,7 @@ class LeaderboardResponse(BaseModel):
     test_id: str
     entries: list[LeaderboardEntry]
     total_participants: int
+    next_cursor: Optional[int] = None  # pass as after_rank to fetch the next page
 
 
 class LeaderboardFilters(BaseModel):
@@ -3,14 +3,16 @@ Pydantic schemas for submissions.
 """
 
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 
+from app.schemas.execution import MAX_CODE_LENGTH
+
 
 class SubmissionRequest(BaseModel):
     """Request model for submitting code."""
     question_id: str = Field(..., description="UUID of the question")
-    code: str = Field(..., description="Source code to submit")
+    code: str = Field(..., min_length=1, max_length=MAX_CODE_LENGTH, description="Source code to submit")
     language: str = Field(..., pattern="^(python|cpp|java)$", description="Programming language")
     is_final: bool = Field(False, description="Whether this is the final submission that ends the test")
 
@@ -46,6 +48,8 @@ class SubmissionDetail(BaseModel):
 
 class SubmissionListItem(BaseModel):
     """Submission item for list views."""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     id: str
     student_name: str
     student_id: str
@@ -0,0 +1,155 @@
+"""
+Content-addressed cache for Groq chat completions.
+Only deterministic (temperature 0) calls are cached: the same prompt then always
+produces the same text, so retries and re-submissions of identical code skip
+the network round-trip and token generation entirely.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import orjson
+from openai import AsyncOpenAI
+
+from app.config import get_settings
+from app.services.cache import get_cache
+from app.services.groq_client import groq_semaphore
+from app.services.json_repair import IncrementalJsonParser
+
+
+LLM_CACHE_TTL = 24 * 60 * 60  # seconds
+_LLM_CACHE_MAX = 2048
+
+# {key: (stored_at, content)}, least recently used first
+_LLM_CACHE: OrderedDict[str, tuple[float, str]] = OrderedDict()
+_LLM_CACHE_LOCK = threading.Lock()
+
+
+def completion_key(model: str, messages: list[dict], temperature: float, max_tokens: int) -> str:
+    """SHA-256 of everything that determines the completion text."""
+    payload = orjson.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _get_local(key: str) -> Optional[str]:
+    with _LLM_CACHE_LOCK:
+        entry = _LLM_CACHE.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= LLM_CACHE_TTL:
+            del _LLM_CACHE[key]
+            return None
+        _LLM_CACHE.move_to_end(key)
+        return entry[1]
+
+
+def _set_local(key: str, content: str) -> None:
+    with _LLM_CACHE_LOCK:
+        _LLM_CACHE[key] = (time.monotonic(), content)
+        _LLM_CACHE.move_to_end(key)
+        while len(_LLM_CACHE) > _LLM_CACHE_MAX:
+            _LLM_CACHE.popitem(last=False)
+
+
+async def cached_completion(
+    client: AsyncOpenAI,
+    *,
+    model: str,
+    messages: list[dict],
+    temperature: float,
+    max_tokens: int,
+    stop_at_json: bool = False
+) -> str:
+    """
+    Return the stripped message content of a chat completion.
+
+    Looks in the in-process LRU, then Redis (when REDIS_URL is set), before
+    calling the API. Non-zero temperatures, empty replies and replies cut
+    off by max_tokens (or whose JSON object never closed) are never cached.
+    With stop_at_json the reply is streamed and cut off as soon as its first
+    top-level JSON object is complete.
+    """
+    settings = get_settings()
+    cacheable = settings.llm_cache_enabled and temperature == 0
+    redis_key = None
+
+    if cacheable:
+        key = completion_key(model, messages, temperature, max_tokens)
+        content = _get_local(key)
+        if content is not None:
+            return content
+
+        redis_key = f"llm:{key}"
+        cached = await get_cache(settings).get(redis_key)
+        if cached is not None:
+            content = cached.decode() if isinstance(cached, bytes) else cached
+            _set_local(key, content)
+            return content
+
+    # Only calls that reach the API count against the concurrency cap
+    async with groq_semaphore:
+        if stop_at_json:
+            content, complete = await _stream_json(
+                client, model=model, messages=messages, temperature=temperature, max_tokens=max_tokens
+            )
+        else:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+            choice = response.choices[0]
+            content = (choice.message.content or "").strip()
+            complete = choice.finish_reason != "length"
+
+    if cacheable and complete and content:
+        _set_local(key, content)
+        await get_cache(settings).setex(redis_key, LLM_CACHE_TTL, content)
+    return content
+
+
+async def _stream_json(
+    client: AsyncOpenAI,
+    *,
+    model: str,
+    messages: list[dict],
+    temperature: float,
+    max_tokens: int
+) -> tuple[str, bool]:
+    """
+    Stream a completion until its JSON object closes, then drop the stream so
+    no further tokens are generated. Returns (text, whether the object closed):
+    the object on its own, already repaired by the parser, or if it never
+    closed, whatever arrived for the caller to repair.
+    """
+    parser = IncrementalJsonParser()
+    received = []
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True,
+    )
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                received.append(delta)
+                parser.feed(delta)
+                if parser.done:
+                    break
+    finally:
+        await stream.close()
+    if parser.done:
+        return parser.finalize(), True
+    return "".join(received).strip(), False
@@ -2,27 +2,19 @@
 AI-based code evaluation using Groq (OpenAI-compatible API, free tier).
 """
 
-import json
-import re
-
-from openai import AsyncOpenAI, OpenAI
+import orjson
 
 from app.config import get_settings
 from app.schemas.evaluation import AIEvaluation
+from app.services._llm_cache import cached_completion
+from app.services.groq_client import get_async_client
+from app.services.json_repair import IncrementalJsonParser
+from app.services.prompt_template import PromptTemplate
 
 
-GROQ_BASE_URL = "https://api.groq.com/openai/v1"
 settings = get_settings()
 
 
-def _groq_client() -> OpenAI:
-    return OpenAI(api_key=settings.groq_api_key, base_url=GROQ_BASE_URL)
-
-
-def _groq_async_client() -> AsyncOpenAI:
-    return AsyncOpenAI(api_key=settings.groq_api_key, base_url=GROQ_BASE_URL)
-
-
 EVALUATION_PROMPT = """You are an expert code reviewer evaluating a coding submission for a programming test.
 
 Analyze the following code and provide a structured evaluation:
@@ -51,6 +43,40 @@ Please evaluate the code and respond with a JSON object containing:
 
 Respond ONLY with a complete, valid JSON object. Ensure the JSON is complete with all required fields and properly closed braces. No markdown formatting, no extra text, just pure JSON.
 """
+_EVALUATION_TEMPLATE = PromptTemplate(EVALUATION_PROMPT)
+
+# Output cap. Fits the full JSON the prompt asks for (3-5 suggestions, a
+# 3-6 sentence justification) with room to spare; streaming stops at the
+# closing brace, so unused budget costs nothing.
+EVALUATION_MAX_TOKENS = 1024
+
+
+def _fallbacks(**fields) -> dict[bool, AIEvaluation]:
+    """Default evaluations, keyed by whether every testcase passed."""
+    return {
+        all_passed: AIEvaluation(
+            code_quality_score=base_score,
+            logical_clarity_score=base_score,
+            time_complexity="Unknown",
+            space_complexity="Unknown",
+            overall_score=base_score,
+            **fields,
+        )
+        for all_passed, base_score in ((True, 8.0), (False, 5.0))
+    }
+
+
+# Built once and shared by every failed evaluation, so callers must not mutate them
+_FALLBACK = _fallbacks()
+_FALLBACK_EMPTY = _fallbacks(
+    suggestions=[
+        "AI evaluation returned no content (safety filter or error). Consider reviewing the solution manually."
+    ],
+    justification="The AI model did not return any usable evaluation. Default scores were assigned based on testcase results.",
+)
+_FALLBACK_INVALID = _fallbacks(
+    justification="The AI evaluation JSON was invalid and could not be parsed. Default scores were assigned based on testcase results.",
+)
 
 
 def extract_json_from_text(text: str) -> str:
@@ -58,90 +84,27 @@ def extract_json_from_text(text: str) -> str:
     Robustly extract JSON string from text that might contain markdown or other noise.
     Handles incomplete/truncated JSON responses.
     """
-    text = text.strip()
-    
-    # Try to find markdown code blocks first
-    json_match = re.search(r'```(?:json)?\s*(.*?)\s*```', text, re.DOTALL)
-    if json_match:
-        text = json_match.group(1)
-    
-    # Find the first '{' and the last '}'
-    start_idx = text.find('{')
-    end_idx = text.rfind('}')
-    
-    if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-        json_str = text[start_idx:end_idx+1]
-        # Remove trailing commas which are common in LLM JSON output but invalid in standard JSON
-        json_str = re.sub(r',(\s*})', r'\1', json_str)
-        return json_str
-    
-    # If we have an incomplete JSON (starts with { but no closing }), try to reconstruct it
-    if start_idx != -1 and end_idx == -1:
-        # Try to find the last complete key-value pair
-        incomplete_json = text[start_idx:]
-        # Look for common patterns that might indicate the end of JSON
-        last_comma = incomplete_json.rfind(',')
-        last_colon = incomplete_json.rfind(':')
-        
-        # If we have a trailing comma or incomplete value, try to complete it
-        if last_comma > last_colon and last_comma > 0:
-            # Remove trailing comma and close the JSON
-            incomplete_json = incomplete_json[:last_comma] + '}'
-            return incomplete_json
-        
-        # If we have an incomplete value, try to close it with reasonable defaults
-        if ':' in incomplete_json and incomplete_json.endswith('"'):
-            # If it ends with a quote, try to close the string and add a closing brace
-            incomplete_json = incomplete_json + '"}}'
-            return incomplete_json
-        elif ':' in incomplete_json:
-            # If there's a colon but no closing quote, add reasonable defaults
-            incomplete_json = incomplete_json + ' "Unknown"}}'
-            return incomplete_json
-    
-    return text
+    parser = IncrementalJsonParser()
+    parser.feed(text)
+    return parser.finalize()
 
 
 def _parse_evaluation_response(response_text: str, testcases_passed: int, total_testcases: int) -> AIEvaluation:
     """Parse LLM response text into AIEvaluation, with fallback on parse errors."""
     if not response_text or not response_text.strip():
-        base_score = 8.0 if testcases_passed == total_testcases else 5.0
-        return AIEvaluation(
-            code_quality_score=base_score,
-            logical_clarity_score=base_score,
-            time_complexity="Unknown",
-            space_complexity="Unknown",
-            suggestions=[
-                "AI evaluation returned no content (safety filter or error). Consider reviewing the solution manually."
-            ],
-            justification="The AI model did not return any usable evaluation. Default scores were assigned based on testcase results.",
-            overall_score=base_score,
-        )
-    json_str = extract_json_from_text(response_text)
-    try:
-        evaluation_data = json.loads(json_str)
-    except json.JSONDecodeError:
-        fixed_json = json_str
-        fixed_json = re.sub(r',(\s*[}\]])', r'\1', fixed_json)
-        fixed_json = re.sub(r"(?<!\\)'", '"', fixed_json)
-        fixed_json = re.sub(r'([^:]+:\s*"[^"]*)\s+"([^"]*"[^}]*})', r'\1", "\2', fixed_json)
-        fixed_json = re.sub(r'("\w+")\s*([^,}\]])', r'\1, \2', fixed_json)
-        brace_count = fixed_json.count('{') - fixed_json.count('}')
-        if brace_count > 0:
-            fixed_json += '}' * brace_count
+        return _FALLBACK_EMPTY[testcases_passed == total_testcases]
+    evaluation_data = None
+    if response_text.startswith("{"):
+        # Streamed replies arrive already cut to the repaired object; don't scan them again
+        try:
+            evaluation_data = orjson.loads(response_text)
+        except orjson.JSONDecodeError:
+            pass
+    if evaluation_data is None:
         try:
-            evaluation_data = json.loads(fixed_json)
-        except json.JSONDecodeError:
-            base_score = 8.0 if testcases_passed == total_testcases else 5.0
-            return AIEvaluation(
-                code_quality_score=base_score,
-                logical_clarity_score=base_score,
-                time_complexity="Unknown",
-                space_complexity="Unknown",
-                suggestions=[],
-                justification="The AI evaluation JSON was invalid and could not be parsed. Default scores were assigned based on testcase results.",
-                overall_score=base_score,
-            )
+            evaluation_data = orjson.loads(extract_json_from_text(response_text))
+        except orjson.JSONDecodeError:
+            return _FALLBACK_INVALID[testcases_passed == total_testcases]
 
     return AIEvaluation(
         code_quality_score=float(evaluation_data.get("code_quality_score", 5)),
@@ -172,71 +135,27 @@ async def evaluate_code_with_ai(
         total_testcases: Total number of testcases
 
     Returns:
-        AIEvaluation with structured scores and feedback
+        AIEvaluation with structured scores and feedback. Fallback results are
+        shared instances; use model_copy(update=...) to change fields.
     """
-    base_score = 8.0 if testcases_passed == total_testcases else 5.0
-    fallback = AIEvaluation(
-        code_quality_score=base_score,
-        logical_clarity_score=base_score,
-        time_complexity="Unknown",
-        space_complexity="Unknown",
-        overall_score=base_score
-    )
-    try:
-        client = _groq_async_client()
-        prompt = EVALUATION_PROMPT.format(
-            language=language,
-            problem_description=problem_description,
-            code=code,
-            testcases_passed=testcases_passed,
-            total_testcases=total_testcases
-        )
-        response = await client.chat.completions.create(
-            model=settings.groq_model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=1024,
-        )
-        content = (response.choices[0].message.content or "").strip()
-        return _parse_evaluation_response(content, testcases_passed, total_testcases)
-    except Exception:
-        return fallback
-
-
-def evaluate_code_sync(
-    code: str,
-    language: str,
-    problem_description: str,
-    testcases_passed: int,
-    total_testcases: int
-) -> AIEvaluation:
-    """
-    Synchronous version of code evaluation using Groq.
-    """
-    base_score = 8.0 if testcases_passed == total_testcases else 5.0
-    fallback = AIEvaluation(
-        code_quality_score=base_score,
-        logical_clarity_score=base_score,
-        time_complexity="Unknown",
-        space_complexity="Unknown",
-        overall_score=base_score
-    )
     try:
-        client = _groq_client()
-        prompt = EVALUATION_PROMPT.format(
+        client = get_async_client()
+        prompt = _EVALUATION_TEMPLATE.render(
             language=language,
             problem_description=problem_description,
             code=code,
             testcases_passed=testcases_passed,
             total_testcases=total_testcases
         )
-        response = client.chat.completions.create(
+        content = await cached_completion(
+            client,
             model=settings.groq_model,
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=1024,
+            # Deterministic when cached, so identical submissions get identical scores
+            temperature=0 if settings.llm_cache_enabled else 0.3,
+            max_tokens=EVALUATION_MAX_TOKENS,
+            stop_at_json=True,
         )
-        content = (response.choices[0].message.content or "").strip()
         return _parse_evaluation_response(content, testcases_passed, total_testcases)
     except Exception:
-        return fallback
+        return _FALLBACK[testcases_passed == total_testcases]
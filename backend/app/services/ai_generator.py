@@ -2,20 +2,28 @@
 AI-based content generation using Groq (OpenAI-compatible API, free tier).
 """
 
-import json
+import ast
 import re
+from typing import Optional
 
-from openai import AsyncOpenAI
+import orjson
+from openai import APIError
 
 from app.config import get_settings
+from app.services._llm_cache import cached_completion
+from app.services.groq_client import get_async_client
+from app.services.prompt_template import PromptTemplate
 
 
-GROQ_BASE_URL = "https://api.groq.com/openai/v1"
 settings = get_settings()
 
 
-def _groq_client() -> AsyncOpenAI:
-    return AsyncOpenAI(api_key=settings.groq_api_key, base_url=GROQ_BASE_URL)
+_JSON_FENCE_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+_FENCE_RE = re.compile(r'```\s*(.*?)\s*```', re.DOTALL)
+# Calls that only belong in a solution, not in starter code
+_FORBIDDEN_STARTER_CALLS = {"range", "enumerate", "sorted"}
+# Two-pointer / binary-search bookkeeping in the driver
+_FORBIDDEN_DRIVER_PAIRS = [{"left", "right"}, {"low", "high"}]
 
 
 # Simplified prompt - AI only generates Python driver code
@@ -64,6 +72,12 @@ REQUIREMENTS:
 
 CRITICAL: The starter_code must NOT contain the solution. It should only have the function signature and a placeholder (pass or comment). Students will write the actual implementation.
 """
+_GENERATION_TEMPLATE = PromptTemplate(GENERATION_PROMPT)
+
+# Output budget: title, description and code snippets, plus each testcase
+GENERATION_BASE_TOKENS = 1024
+GENERATION_TOKENS_PER_TESTCASE = 256
+GENERATION_MAX_TOKENS = 4096
 
 
 async def generate_question_with_ai(topic: str, difficulty: str, testcase_count: int = 5):
@@ -72,42 +86,47 @@ async def generate_question_with_ai(topic: str, difficulty: str, testcase_count:
 
     for attempt in range(max_retries):
         try:
-            client = _groq_client()
-            formatted_prompt = GENERATION_PROMPT.format(
+            client = get_async_client()
+            formatted_prompt = _GENERATION_TEMPLATE.render(
                 topic=topic, difficulty=difficulty, testcase_count=testcase_count
             )
             print(f"[DEBUG] Generating question (attempt {attempt+1}/{max_retries}): prompt='{topic}'")
 
-            response = await client.chat.completions.create(
+            # temperature 0.7 is never cached: regenerating should give a new question
+            response_text = await cached_completion(
+                client,
                 model=settings.groq_model,
                 messages=[{"role": "user", "content": formatted_prompt}],
                 temperature=0.7,
-                max_tokens=4096,
+                max_tokens=min(
+                    GENERATION_MAX_TOKENS,
+                    GENERATION_BASE_TOKENS + GENERATION_TOKENS_PER_TESTCASE * testcase_count
+                ),
             )
 
-            raw = response.choices[0].message.content or ""
-            response_text = raw.strip()
-
             if not response_text:
                 raise ValueError("AI response was empty")
 
             # Clean markdown code blocks if present
             if "```json" in response_text:
-                match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
+                match = _JSON_FENCE_RE.search(response_text)
                 if match:
                     response_text = match.group(1)
             elif "```" in response_text:
-                match = re.search(r'```\s*(.*?)\s*```', response_text, re.DOTALL)
+                match = _FENCE_RE.search(response_text)
                 if match:
                     response_text = match.group(1)
 
-            result = json.loads(response_text)
+            result = orjson.loads(response_text)
             validate_python_code(result.get('code_snippets', {}).get('python', {}))
 
             print(f"[DEBUG] Generation successful on attempt {attempt+1}")
             return result
 
-        except json.JSONDecodeError as e:
+        except APIError:
+            # Rate limits and transport errors were already retried with backoff by the client
+            raise
+        except orjson.JSONDecodeError as e:
             print(f"[WARNING] JSON Parse Error on attempt {attempt+1}: {e}")
             last_error = e
         except Exception as e:
@@ -118,6 +137,128 @@ async def generate_question_with_ai(topic: str, difficulty: str, testcase_count:
     raise last_error if last_error else ValueError("Failed to generate question after multiple attempts")
 
 
+def _starter_solution_logic(func: ast.FunctionDef) -> Optional[str]:
+    """Describe the first construct in a starter function that implements a solution."""
+    for node in ast.walk(func):
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            return "for loop"
+        if isinstance(node, ast.While):
+            return "while loop"
+        if isinstance(node, ast.If):
+            return "if statement"
+        if isinstance(node, ast.Return) and node.value is not None:
+            return "return statement with value"
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FORBIDDEN_STARTER_CALLS:
+            return f"{node.func.id}() call"
+    return None
+
+
+def _is_placeholder(stmt: ast.stmt) -> bool:
+    """pass, a docstring/..., a bare return or a raise (e.g. NotImplementedError)."""
+    if isinstance(stmt, (ast.Pass, ast.Raise)):
+        return True
+    if isinstance(stmt, ast.Return):
+        return stmt.value is None
+    return isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant)
+
+
+def _iterates_indices(iterable: ast.expr) -> bool:
+    """`range(...)` or `enumerate(...)`: index-driven iteration."""
+    return (
+        isinstance(iterable, ast.Call)
+        and isinstance(iterable.func, ast.Name)
+        and iterable.func.id in ("range", "enumerate")
+    )
+
+
+def _is_io_iterable(iterable: ast.expr) -> bool:
+    """Input being split up, e.g. `line.split()`, `sys.stdin.read().split()`, `map(int, ...)`."""
+    if not isinstance(iterable, ast.Call):
+        return False
+    func = iterable.func
+    if isinstance(func, ast.Attribute):
+        return func.attr in ("split", "splitlines", "readlines")
+    return isinstance(func, ast.Name) and func.id == "map"
+
+
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+def _comprehension_has_algorithm(node: ast.expr) -> bool:
+    """
+    Index loops, cross products and nested comprehensions count as algorithm
+    logic; parsing input (`[int(x) for x in data.split()]`) or formatting
+    output (`' '.join(str(x) for x in res)`) does not.
+    """
+    if len(node.generators) > 1:
+        return True
+    if _iterates_indices(node.generators[0].iter):
+        return True
+    elements = [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+    for element in elements:
+        for inner in ast.walk(element):
+            # A row of input parsed per line (`[int(x) for x in line.split()]`) is fine
+            if isinstance(inner, _COMPREHENSIONS) and not all(
+                _is_io_iterable(gen.iter) for gen in inner.generators
+            ):
+                return True
+    return False
+
+
+def _driver_has_algorithm(tree: ast.Module) -> bool:
+    """True if the driver does more than parse input, call the function and print."""
+    for node in ast.walk(tree):
+        # Input loops (`while True:`, `while line:`) are fine; `while lo < hi:` isn't
+        if isinstance(node, ast.While) and isinstance(node.test, ast.Compare):
+            return True
+        if isinstance(node, _COMPREHENSIONS) and _comprehension_has_algorithm(node):
+            return True
+        if isinstance(node, (ast.For, ast.AsyncFor)) and _iterates_indices(node.iter):
+            return True
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "sorted":
+            return True
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Tuple):
+                    names = {elt.id for elt in target.elts if isinstance(elt, ast.Name)}
+                    if names in _FORBIDDEN_DRIVER_PAIRS:
+                        return True
+                elif isinstance(target, ast.Name):
+                    # dp tables and result accumulators
+                    if target.id == "dp" and isinstance(node.value, ast.List):
+                        return True
+                    if target.id == "result" and isinstance(node.value, ast.List) and not node.value.elts:
+                        return True
+    return False
+
+
+def _code_lines(source: str) -> list[str]:
+    """Stripped non-empty, non-comment lines, in one pass."""
+    lines = []
+    for raw in source.split('\n'):
+        line = raw.strip()
+        if line and not line.startswith('#'):
+            lines.append(line)
+    return lines
+
+
+def _trivial_starter_name(starter: str) -> Optional[str]:
+    """
+    The function name if the starter is only `def name(...):` followed by
+    `pass` or `...` (comments aside), else None.
+    """
+    lines = _code_lines(starter)
+    if len(lines) != 2 or lines[1] not in ("pass", "..."):
+        return None
+
+    signature = lines[0]
+    paren = signature.find("(")
+    if not signature.startswith("def ") or not signature.endswith(":") or paren == -1:
+        return None
+    name = signature[4:paren].strip()
+    return name if name.isidentifier() else None
+
+
 def validate_python_code(python_snippet: dict) -> None:
     """Validate that Python starter_code is incomplete and driver_code doesn't contain algorithm logic."""
     driver = python_snippet.get('driver_code', '')
@@ -126,91 +267,62 @@ def validate_python_code(python_snippet: dict) -> None:
     if not driver or not starter:
         return
 
-    # Extract function name from starter code (first def line)
-    func_match = re.search(r'def\s+(\w+)\s*\(', starter)
-    if not func_match:
-        raise ValueError("Starter code must contain a function definition")
+    try:
+        driver_tree = ast.parse(driver)
+    except SyntaxError as e:
+        raise ValueError(f"Python driver_code is not valid Python: {e}")
 
-    func_name = func_match.group(1)
+    # Most generated starters are just a signature and `pass`; those need no parse
+    func = None
+    func_name = _trivial_starter_name(starter)
+    if func_name is None:
+        try:
+            starter_tree = ast.parse(starter)
+        except SyntaxError as e:
+            raise ValueError(f"Python starter_code is not valid Python: {e}")
+
+        # The solution function is the first def (possibly a method of a class)
+        func = next(
+            (node for node in ast.walk(starter_tree) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))),
+            None
+        )
+        if func is None:
+            raise ValueError("Starter code must contain a function definition")
+
+        func_name = func.name
 
     # Driver must call the same function name
     if f'{func_name}(' not in driver:
         raise ValueError(f"Python driver_code MUST call the {func_name}() function!")
 
-    # Validate starter_code is incomplete (should only have function signature + pass/comment)
-    # Remove comments and empty lines, then check what remains
-    starter_lines = [l.strip() for l in starter.split('\n') if l.strip()]
-    starter_lines_no_comments = [l for l in starter_lines if not l.startswith('#')]
-    
-    # Find the function definition line
-    func_def_idx = None
-    for i, line in enumerate(starter_lines_no_comments):
-        if line.startswith('def '):
-            func_def_idx = i
-            break
-    
-    if func_def_idx is None:
-        raise ValueError("Starter code must contain a function definition")
-    
-    # Everything after the function definition should be minimal (just pass or a comment)
-    body_lines = starter_lines_no_comments[func_def_idx + 1:]
-    
-    # Check for forbidden patterns that indicate a solution
-    FORBIDDEN_STARTER_PATTERNS = [
-        (r'\bfor\s+\w+\s+in\s+', 'for loop'),
-        (r'\bwhile\s+', 'while loop'),
-        (r'\bif\s+.*:', 'if statement'),
-        (r'\belif\s+.*:', 'elif statement'),
-        (r'\breturn\s+[^#\n]', 'return statement with value'),
-        (r'\brange\s*\(', 'range() call'),
-        (r'\benumerate\s*\(', 'enumerate() call'),
-        (r'\bsorted\s*\(', 'sorted() call'),
-    ]
-    
-    body_text = '\n'.join(body_lines)
-    
-    # If body has more than just "pass", it's likely a solution
-    body_clean = body_text.strip()
-    if body_clean and body_clean != 'pass':
-        # Check for forbidden patterns
-        for pattern, desc in FORBIDDEN_STARTER_PATTERNS:
-            if re.search(pattern, body_text, re.IGNORECASE):
-                raise ValueError(
-                    f"INVALID Python starter_code: Contains solution logic ({desc})! "
-                    f"Starter code must only have function signature with 'pass' or a comment. "
-                    f"Found: {body_text[:100]}..."
-                )
-        
-        # If there are multiple non-empty lines (beyond def), it's likely a solution
-        if len(body_lines) > 1:
+    # Validate starter_code is incomplete (only a signature with pass, a docstring or a comment)
+    body = [stmt for stmt in func.body if not _is_placeholder(stmt)] if func else []
+    if body:
+        desc = _starter_solution_logic(func)
+        if desc:
             raise ValueError(
-                f"INVALID Python starter_code: Contains multiple lines of implementation code! "
+                f"INVALID Python starter_code: Contains solution logic ({desc})! "
                 f"Starter code must only have function signature with 'pass' or a comment. "
-                f"Found {len(body_lines)} lines of code after function definition."
+                f"Found: {(ast.get_source_segment(starter, body[0]) or '')[:100]}..."
             )
 
-    # Validate driver_code doesn't contain algorithm logic
-    FORBIDDEN_DRIVER_PATTERNS = [
-        r'\bfor\s+\w+\s+in\s+range\(',
-        r'\bfor\s+\w+,\s*\w+\s+in\s+enumerate',
-        r'\bwhile\s+(left|right|low|high|i|j)',
-        r'\[\s*\w+\s+for\s+\w+\s+in',
-        r'\bsorted\s*\(',
-        r'\bleft\s*,\s*right\s*=',
-        r'\blow\s*,\s*high\s*=',
-        r'\bdp\s*=\s*\[',
-        r'\bresult\s*=\s*\[\]',
-    ]
-
-    for pattern in FORBIDDEN_DRIVER_PATTERNS:
-        if re.search(pattern, driver, re.IGNORECASE):
+        # If there are multiple statements in the body, it's likely a solution
+        if len(body) > 1:
             raise ValueError(
-                f"INVALID Python driver_code: Contains algorithm logic. "
-                f"Driver code must ONLY parse input, call solution(), and print result!"
+                f"INVALID Python starter_code: Contains multiple lines of implementation code! "
+                f"Starter code must only have function signature with 'pass' or a comment. "
+                f"Found {len(body)} statements after function definition."
             )
 
+    # Validate driver_code doesn't contain algorithm logic
+    if _driver_has_algorithm(driver_tree):
+        raise ValueError(
+            f"INVALID Python driver_code: Contains algorithm logic. "
+            f"Driver code must ONLY parse input, call solution(), and print result!"
+        )
+
     # Check driver length
-    driver_lines = [l.strip() for l in driver.split('\n') if l.strip() and not l.strip().startswith('#')]
+    driver_lines = _code_lines(driver)
     if len(driver_lines) > 12:
         raise ValueError(
             f"Python driver_code is too long ({len(driver_lines)} lines). "
@@ -0,0 +1,95 @@
+"""
+Optional Redis cache for hot read paths.
+Disabled when REDIS_URL is not configured, in which case every call is a no-op
+and callers fall through to Supabase.
+"""
+
+from functools import lru_cache
+from typing import Annotated, Optional
+
+from fastapi import Depends
+
+from app.config import get_settings, Settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is optional for local development
+    aioredis = None
+
+
+LEADERBOARD_TTL = 30  # seconds
+
+
+def leaderboard_key(test_id: str, limit: int, offset: int, after_rank: Optional[int] = None) -> str:
+    """Cache key for one serialized leaderboard page."""
+    return f"lb:{test_id}:{limit}:{offset}:{after_rank}"
+
+
+class Cache:
+    """Thin wrapper around an optional Redis client. Errors are logged, never raised."""
+
+    def __init__(self, client: Optional["aioredis.Redis"] = None):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if not self.client:
+            return None
+        try:
+            return await self.client.get(key)
+        except Exception as e:
+            print(f"Cache get failed for {key}: {e}")
+            return None
+
+    async def setex(self, key: str, ttl: int, value: bytes | str | int) -> None:
+        if not self.client:
+            return
+        try:
+            await self.client.setex(key, ttl, value)
+        except Exception as e:
+            print(f"Cache set failed for {key}: {e}")
+
+    async def delete(self, *keys: str) -> None:
+        if not self.client or not keys:
+            return
+        try:
+            await self.client.unlink(*keys)
+        except Exception as e:
+            print(f"Cache delete failed for {keys}: {e}")
+
+    async def delete_pattern(self, pattern: str) -> None:
+        """Delete every key matching a glob pattern (SCAN-based, non-blocking on the server)."""
+        if not self.client:
+            return
+        try:
+            keys = [key async for key in self.client.scan_iter(match=pattern, count=500)]
+            if keys:
+                await self.client.unlink(*keys)
+        except Exception as e:
+            print(f"Cache delete failed for {pattern}: {e}")
+
+    async def close(self) -> None:
+        if self.client:
+            await self.client.aclose()
+
+
+async def invalidate_leaderboard(cache: Cache, test_id: str) -> None:
+    """Drop all cached pages for a test."""
+    await cache.delete_pattern(f"lb:{test_id}:*")
+
+
+@lru_cache(maxsize=1)
+def _cache_for(redis_url: Optional[str]) -> Cache:
+    """Shared Cache per URL so the Redis connection pool is reused."""
+    if not redis_url:
+        return Cache()
+    if aioredis is None:
+        print("REDIS_URL is set but the redis package is not installed; caching disabled")
+        return Cache()
+    return Cache(aioredis.from_url(redis_url))
+
+
+def get_cache(
+    settings: Annotated[Settings, Depends(get_settings)]
+) -> Cache:
+    """Get the shared cache (a no-op when Redis is not configured)."""
+    return _cache_for(settings.redis_url)
@@ -4,10 +4,25 @@ Analyzes code structure to estimate time and space complexity.
 """
 
 import ast
+import hashlib
 import re
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Tuple, Optional
 
 
+# Analysis is pure, so results are memoized by a digest of the source.
+# {blake2b digest: result}, least recently used first
+_ANALYSIS_CACHE: "OrderedDict[bytes, Dict[str, str]]" = OrderedDict()
+_ANALYSIS_CACHE_MAX = 1024
+_ANALYSIS_CACHE_LOCK = threading.Lock()
+
+
+def _code_digest(code: str) -> bytes:
+    """Short key for a piece of source, so large snippets aren't kept as keys."""
+    return hashlib.blake2b(code.encode(), digest_size=16).digest()
+
+
 class ComplexityAnalyzer:
     """
     Analyzes Python code to estimate time and space complexity.
@@ -24,21 +39,34 @@ class ComplexityAnalyzer:
         Returns:
             Dictionary containing estimated time and space complexity
         """
+        key = _code_digest(code)
+        with _ANALYSIS_CACHE_LOCK:
+            cached = _ANALYSIS_CACHE.get(key)
+            if cached is not None:
+                _ANALYSIS_CACHE.move_to_end(key)
+                return dict(cached)
+        
         try:
             tree = ast.parse(code)
             analyzer = _ComplexityVisitor()
             analyzer.visit(tree)
             
-            return {
+            result = {
                 "time_complexity": analyzer.estimate_time_complexity(),
                 "space_complexity": analyzer.estimate_space_complexity()
             }
         except Exception:
             # If AST parsing fails, return unknown
-            return {
+            result = {
                 "time_complexity": "Unknown",
                 "space_complexity": "Unknown"
             }
+        
+        with _ANALYSIS_CACHE_LOCK:
+            _ANALYSIS_CACHE[key] = result
+            if len(_ANALYSIS_CACHE) > _ANALYSIS_CACHE_MAX:
+                _ANALYSIS_CACHE.popitem(last=False)
+        return dict(result)
 
 
 class _ComplexityVisitor(ast.NodeVisitor):
@@ -53,6 +81,8 @@ class _ComplexityVisitor(ast.NodeVisitor):
         self.data_structure_operations = []
         self.function_calls = []
         self.nested_functions = 0
+        # Names of the functions currently being visited, innermost last
+        self._func_stack: List[str] = []
         
     def visit_For(self, node):
         self.loop_nesting_levels += 1
@@ -73,16 +103,12 @@ class _ComplexityVisitor(ast.NodeVisitor):
         self.loop_nesting_levels -= 1
     
     def visit_FunctionDef(self, node):
-        # Check if this is a recursive call
-        for item in ast.walk(node):
-            if isinstance(item, ast.Call) and isinstance(item.func, ast.Name):
-                if item.func.id == node.name:
-                    self.recursion_detected = True
-        
-        # Visit the function body
+        # Visit the function body; visit_Call flags calls to any enclosing function
+        self._func_stack.append(node.name)
         self.nested_functions += 1
         self.generic_visit(node)
         self.nested_functions -= 1
+        self._func_stack.pop()
     
     def visit_Call(self, node):
         # Track function calls that might affect complexity
@@ -90,6 +116,10 @@ class _ComplexityVisitor(ast.NodeVisitor):
             func_name = node.func.id
             self.function_calls.append(func_name)
             
+            # Check if this is a recursive call
+            if func_name in self._func_stack:
+                self.recursion_detected = True
+            
             # Detect common operations that affect complexity
             if func_name in ['append', 'extend', 'insert']:
                 self.data_structure_operations.append('list_mutation')
@@ -103,15 +133,6 @@ class _ComplexityVisitor(ast.NodeVisitor):
         # Continue visiting
         self.generic_visit(node)
     
-    def visit_Subscript(self, node):
-        # Check for indexing operations
-        if hasattr(node.ctx, '_fields') and 'Load' in str(type(node.ctx)):
-            # This is accessing an element, not assignment
-            pass
-        
-        # Continue visiting
-        self.generic_visit(node)
-    
     def estimate_time_complexity(self) -> str:
         """
         Estimate time complexity based on AST analysis.
@@ -0,0 +1,56 @@
+"""
+Shared Groq client (OpenAI-compatible API).
+The client is created on first use and reused, so calls share one keep-alive
+connection pool instead of paying a TLS handshake each.
+"""
+
+import asyncio
+import importlib.util
+import threading
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.config import get_settings
+
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+GROQ_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+GROQ_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+# HTTP/2 multiplexes concurrent calls over one connection; it needs the h2 package
+GROQ_HTTP2 = importlib.util.find_spec("h2") is not None
+# The SDK retries rate limits (429, honouring Retry-After), 5xx, timeouts and
+# connection errors with exponential backoff and jitter
+GROQ_MAX_RETRIES = 3
+
+# Cap on in-flight Groq calls per process, held across the SDK's retries.
+# A burst queues here instead of cascading into more 429s.
+MAX_CONCURRENT_GROQ_CALLS = 4
+groq_semaphore = asyncio.Semaphore(MAX_CONCURRENT_GROQ_CALLS)
+
+_async_client: Optional[AsyncOpenAI] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_async_client() -> AsyncOpenAI:
+    """The process-wide async Groq client."""
+    global _async_client
+    with _CLIENT_LOCK:
+        if _async_client is None:
+            _async_client = AsyncOpenAI(
+                api_key=get_settings().groq_api_key,
+                base_url=GROQ_BASE_URL,
+                max_retries=GROQ_MAX_RETRIES,
+                http_client=httpx.AsyncClient(http2=GROQ_HTTP2, limits=GROQ_LIMITS, timeout=GROQ_TIMEOUT),
+            )
+        return _async_client
+
+
+async def close_client() -> None:
+    """Close the client if it was created (called on shutdown)."""
+    global _async_client
+    with _CLIENT_LOCK:
+        async_client, _async_client = _async_client, None
+    if async_client is not None:
+        await async_client.close()
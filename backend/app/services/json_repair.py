@@ -0,0 +1,124 @@
+"""
+Best-effort repair of JSON emitted by an LLM.
+"""
+
+import re
+
+import orjson
+
+
+# Characters that end a run of plain text inside / outside a string
+_STRING_SPECIAL_RE = re.compile(r'["\\]')
+_STRUCTURAL_RE = re.compile(r'[{}\[\]",]')
+
+
+class IncrementalJsonParser:
+    """
+    Single-pass scanner that turns LLM output into a best-effort JSON object.
+
+    Text before the first '{' and after its matching '}' (prose, markdown
+    fences) is dropped, trailing commas are removed, and a truncated reply is
+    cut back to its last complete member and closed in LIFO order.
+    Text can be fed in chunks, e.g. as a stream arrives.
+    """
+
+    def __init__(self):
+        self.buf: list[str] = []  # pieces of the output, not single characters
+        self.closers: list[str] = []  # expected closing brackets, innermost last
+        self.in_string = False
+        self.escape = False
+        self.done = False
+        # (pieces in buf, closers) just after the last complete member
+        self._safe: tuple[int, list[str]] | None = None
+
+    def feed(self, chunk: str) -> None:
+        pos = 0
+        end = len(chunk)
+        while pos < end and not self.done:
+            if not self.closers:
+                # Still looking for the opening brace
+                start = chunk.find("{", pos)
+                if start == -1:
+                    return
+                self.buf.append("{")
+                self.closers.append("}")
+                pos = start + 1
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.buf.append(chunk[pos])
+                    self.escape = False
+                    pos += 1
+                    continue
+                # Copy the run up to the next quote or backslash in one slice
+                match = _STRING_SPECIAL_RE.search(chunk, pos)
+                if match is None:
+                    self.buf.append(chunk[pos:])
+                    return
+                stop = match.end()
+                self.buf.append(chunk[pos:stop])
+                if match.group() == "\\":
+                    self.escape = True
+                else:
+                    self.in_string = False
+                pos = stop
+                continue
+
+            # Copy the run up to the next structural character in one slice
+            match = _STRUCTURAL_RE.search(chunk, pos)
+            if match is None:
+                self.buf.append(chunk[pos:])
+                return
+            if match.start() > pos:
+                self.buf.append(chunk[pos:match.start()])
+            pos = match.end()
+
+            ch = match.group()
+            if ch == '"':
+                self.buf.append(ch)
+                self.in_string = True
+            elif ch == "{" or ch == "[":
+                self.buf.append(ch)
+                self.closers.append("}" if ch == "{" else "]")
+            elif ch == "}" or ch == "]":
+                self._drop_trailing_comma()
+                # A mismatched bracket is replaced by the one actually expected
+                self.buf.append(self.closers.pop())
+                if self.closers:
+                    self._safe = (len(self.buf), self.closers.copy())
+                else:
+                    self.done = True
+            else:  # ","
+                self._safe = (len(self.buf), self.closers.copy())
+                self.buf.append(ch)
+
+    def _drop_trailing_comma(self) -> None:
+        # Separators are appended as their own pieces, so whitespace between a
+        # comma and the closer is a whole piece too
+        end = len(self.buf)
+        while end and not self.buf[end - 1].strip():
+            end -= 1
+        if end and self.buf[end - 1] == ",":
+            del self.buf[end - 1:]
+
+    def finalize(self) -> str:
+        """The JSON text seen so far, closed if the object is still open."""
+        if self.done or not self.closers:
+            return "".join(self.buf)
+
+        text = "".join(self.buf).rstrip()
+        if not (self.in_string or text.endswith((":", ",", "{", "["))):
+            # Keep the last member only if it ends in a complete value, not
+            # e.g. a key without a value or a cut-off literal (`"b": tr`)
+            closed = text + "".join(reversed(self.closers))
+            try:
+                orjson.loads(closed)
+                return closed
+            except orjson.JSONDecodeError:
+                pass
+        # The last member is incomplete; keep only what precedes it
+        if self._safe is None:
+            return "{}"
+        length, closers = self._safe
+        return "".join(self.buf[:length]) + "".join(reversed(closers))
@@ -0,0 +1,25 @@
+"""
+Prompt templates parsed once at import.
+"""
+
+from string import Formatter
+
+
+class PromptTemplate:
+    """
+    A str.format-style template ({name} placeholders, {{ }} escapes) split into
+    literal segments up front, so render() only joins strings.
+    Format specs and conversions are not supported.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self._parts = [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+    def render(self, **values) -> str:
+        parts = []
+        for literal, field in self._parts:
+            parts.append(literal)
+            if field is not None:
+                parts.append(str(values[field]))
+        return "".join(parts)
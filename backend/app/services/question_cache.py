@@ -0,0 +1,82 @@
+"""
+Per-process cache of questions with their testcases.
+During a live test every submission for a question needs the same rows.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from supabase import Client
+
+
+# {question_id: (fetched_at, question, testcases)}
+_QUESTION_CACHE: dict[str, tuple[float, dict, list[dict]]] = {}
+# Questions are edited straight through Supabase from the frontend, so nothing
+# here can invalidate on edit; keep the TTL short to bound staleness
+_QUESTION_TTL = 60.0  # seconds
+_QUESTION_CACHE_MAX = 1024
+_QUESTION_CACHE_LOCK = threading.Lock()
+
+
+def _get_cached_question(question_id: str) -> Optional[tuple[dict, list[dict]]]:
+    """Return the cached (question, testcases) if still fresh."""
+    with _QUESTION_CACHE_LOCK:
+        entry = _QUESTION_CACHE.get(question_id)
+    if entry and time.monotonic() - entry[0] < _QUESTION_TTL:
+        return entry[1], entry[2]
+    return None
+
+
+def _cache_question(question_id: str, question: dict, testcases: list[dict]) -> None:
+    """Remember a question, dropping expired entries when the cache is full."""
+    now = time.monotonic()
+    with _QUESTION_CACHE_LOCK:
+        if len(_QUESTION_CACHE) >= _QUESTION_CACHE_MAX:
+            expired = [qid for qid, (ts, _, _) in _QUESTION_CACHE.items() if now - ts >= _QUESTION_TTL]
+            for qid in expired:
+                del _QUESTION_CACHE[qid]
+            if len(_QUESTION_CACHE) >= _QUESTION_CACHE_MAX:
+                _QUESTION_CACHE.clear()
+        _QUESTION_CACHE[question_id] = (now, question, testcases)
+
+
+def get_question_for_participant(
+    question_id: str,
+    user_id: str,
+    supabase: Client
+) -> Optional[tuple[dict, list[dict], Optional[dict]]]:
+    """
+    Return (question, testcases ordered by order_index, participant) for a user,
+    or None if the question doesn't exist. participant is None when the user
+    hasn't joined the question's test.
+
+    Always a single round-trip: a cache hit only needs the participant row, and
+    a miss fetches all three in one embedded query.
+    The returned question/testcases are shared between callers and must not be mutated.
+    """
+    cached = _get_cached_question(question_id)
+    if cached:
+        question, testcases = cached
+        participant_result = supabase.table("participants").select(
+            "id"
+        ).eq("user_id", user_id).eq("test_id", question["test_id"]).limit(1).execute()
+        participant = participant_result.data[0] if participant_result.data else None
+        return question, testcases, participant
+
+    # tests(...) is a left join, so a non-participant still gets the question back
+    result = supabase.table("questions").select(
+        "*, testcases(*), tests(participants(id))"
+    ).eq("id", question_id).eq("tests.participants.user_id", user_id).order(
+        "order_index", foreign_table="testcases"
+    ).limit(1).execute()
+
+    if not result.data:
+        return None
+
+    question = result.data[0]
+    testcases = question.pop("testcases", None) or []
+    participants = (question.pop("tests", None) or {}).get("participants") or []
+
+    _cache_question(question_id, question, testcases)
+    return question, testcases, participants[0] if participants else None
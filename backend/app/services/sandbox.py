@@ -2,15 +2,23 @@
 Docker-based sandboxed code execution service.
 """
 
+import asyncio
+import contextlib
+import json
+import shlex
+import signal
 import subprocess
 import tempfile
 import os
 import time
 import sys
+import threading
 from typing import Optional
 from dataclasses import dataclass
 
+from app.config import get_settings
 from app.schemas.execution import TestcaseInput, TestcaseResult
+from app.services.sandbox_pool import POOL_SIZE, get_pool, remove_stale_containers
 
 
 @dataclass
@@ -27,18 +35,133 @@ class ExecutionResult:
 # Note: On Windows, 'python' is used; on Unix, 'python3' may be needed
 PYTHON_CMD = "python" if sys.platform == "win32" else "python3"
 
+# Runs inside the container around a submission and appends the program's own
+# wall time (seconds) and peak RSS (KB) to stderr, so the reported figures
+# exclude Docker exec overhead. Slim images ship without GNU time.
+_STATS_MARKER = "__codetest_stats__"
+_MEASURE_SCRIPT = f"""\
+import resource, subprocess, sys, time
+start = time.perf_counter()
+code = subprocess.call(sys.argv[1:])
+elapsed = time.perf_counter() - start
+peak_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+sys.stderr.write("\\n{_STATS_MARKER} %f %d\\n" % (elapsed, peak_kb))
+sys.exit(code if code >= 0 else 128 - code)
+"""
+
+# compile_argv/run_argv build the argv (run without a shell) for a source path.
+# measure_cmd (optional) prefixes the run command inside Docker to collect stats.
 LANGUAGE_CONFIG = {
     "python": {
         "extension": ".py",
-        "compile_cmd": None,
-        "run_cmd": f"{PYTHON_CMD} {{file}}",
+        "compile_argv": None,
+        "run_argv": lambda file: [PYTHON_CMD, file],
+        "measure_cmd": ["python3", "-c", _MEASURE_SCRIPT],
         "image": "python:3.11-slim",
     },
 }
 
 
-def create_solution_file(code: str, language: str) -> str:
-    """Create a temporary file with the solution code."""
+def _sandbox_root() -> str:
+    """
+    Directory for solution and input files; it is what gets bind-mounted
+    (read-only) into sandbox containers. On Linux it lives on /dev/shm, a
+    tmpfs, so per-testcase writes never hit disk or an overlay filesystem.
+    """
+    use_shm = sys.platform.startswith("linux") and os.path.isdir("/dev/shm")
+    path = os.path.join("/dev/shm" if use_shm else tempfile.gettempdir(), "codetest-sandbox")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+SANDBOX_DIR = _sandbox_root()
+
+
+def _docker_mount_path(path: str) -> str:
+    """
+    The host path Docker should bind-mount for a local directory. Docker on
+    Windows needs forward slashes and /c/... drive paths (/mnt/c/... under WSL).
+    The docker_host_tmpdir setting overrides the mapping when the daemon
+    sees the sandbox directory under a different path.
+    """
+    override = get_settings().docker_host_tmpdir
+    if override:
+        return override
+    if sys.platform != "win32":
+        return path
+    docker_path = path.replace("\\", "/")
+    if len(docker_path) >= 2 and docker_path[1] == ":":
+        docker_path = "/" + docker_path[0].lower() + docker_path[2:]
+    # Handle WSL paths if present
+    return docker_path.replace("C:/", "/mnt/c/").replace("D:/", "/mnt/d/")
+
+
+# Solution and input files always live in SANDBOX_DIR, so this is resolved once
+DOCKER_MOUNT_DIR = _docker_mount_path(SANDBOX_DIR)
+
+_docker_client = None
+_docker_checked_at: Optional[float] = None
+# How long "Docker unavailable" is remembered before trying to connect again
+_DOCKER_RETRY_INTERVAL = 60.0  # seconds
+_DOCKER_LOCK = threading.Lock()
+
+
+def _get_docker_client():
+    """
+    Shared Docker client, or None if the daemon isn't reachable.
+    Connecting (and the ping) happens once; a failure is retried at most
+    every _DOCKER_RETRY_INTERVAL seconds.
+    """
+    global _docker_client, _docker_checked_at
+    with _DOCKER_LOCK:
+        if _docker_client is not None:
+            return _docker_client
+        now = time.monotonic()
+        if _docker_checked_at is not None and now - _docker_checked_at < _DOCKER_RETRY_INTERVAL:
+            return None
+        _docker_checked_at = now
+        try:
+            import docker
+            # Short timeout so a missing daemon doesn't hang; a pinned version skips autodetection
+            client = docker.from_env(timeout=2, version=get_settings().docker_api_version)
+            # Quick ping to verify Docker is actually running
+            client.ping()
+        except Exception:
+            return None
+        _docker_client = client
+        return client
+
+
+def ensure_images() -> None:
+    """
+    Make sure every language's image is present locally, pulling any that
+    are missing, so the first testcase doesn't wait on a pull. Offline hosts
+    must `docker load` the images beforehand. Pool containers orphaned by a
+    previous run are removed first.
+    """
+    client = _get_docker_client()
+    if client is None:
+        return
+    remove_stale_containers(client)
+    import docker
+    for image in {config["image"] for config in LANGUAGE_CONFIG.values()}:
+        try:
+            client.images.get(image)
+        except docker.errors.ImageNotFound:
+            print(f"Pulling sandbox image {image}")
+            client.images.pull(image)
+
+
+def create_solution_file(
+    code: str,
+    language: str,
+    input_data: Optional[str] = None
+) -> tuple[str, Optional[str]]:
+    """
+    Create a temporary file with the solution code and, if input_data is
+    given, the input file next to it (same name, .in suffix).
+    Returns (code path, input path or None).
+    """
     config = LANGUAGE_CONFIG.get(language)
     if not config:
         raise ValueError(f"Unsupported language: {language}")
@@ -48,17 +171,99 @@ def create_solution_file(code: str, language: str) -> str:
         code = f"public class Solution {{\n{code}\n}}"
     
     suffix = config["extension"]
-    fd, path = tempfile.mkstemp(suffix=suffix)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=SANDBOX_DIR)
+    input_path = None
     
     try:
-        with os.fdopen(fd, 'w') as f:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
             f.write(code)
-        return path
+        if input_data is not None:
+            # The code file's unique name reserves this one too; no second mkstemp
+            input_path = path[:-len(suffix)] + ".in"
+            with open(input_path, 'x', encoding='utf-8') as f:
+                f.write(input_data)
+        return path, input_path
     except:
-        os.unlink(path)
+        _remove_files(path, input_path)
         raise
 
 
+def _remove_files(*paths: Optional[str]) -> None:
+    """Delete sandbox files, ignoring ones never created or already gone."""
+    for path in paths:
+        if path:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+
+
+# Start local runs in a new process group (session on POSIX)
+if sys.platform == "win32":
+    _NEW_PROCESS_GROUP = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    _NEW_PROCESS_GROUP = {"start_new_session": True}
+
+
+def _kill_process_group(proc: subprocess.Popen) -> None:
+    """SIGKILL a local run and every process in its group."""
+    if sys.platform == "win32":
+        proc.kill()
+        return
+    # A new session's id is its leader's pid
+    with contextlib.suppress(ProcessLookupError):
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+# Cap on captured stdout/stderr per run. A program printing in a loop is
+# stopped here instead of growing the server's memory until the time limit.
+MAX_OUTPUT_BYTES = 1_048_576
+# How long to wait for the pipe threads once a run is over (or killed)
+PIPE_CLOSE_TIMEOUT = 0.5  # seconds
+
+
+def _drain_capped(stream, buffer: bytearray, proc: subprocess.Popen, overflow: threading.Event) -> None:
+    """Read a pipe into buffer, killing the run if it exceeds MAX_OUTPUT_BYTES."""
+    with stream:
+        try:
+            while chunk := stream.read1(65536):
+                if len(buffer) + len(chunk) > MAX_OUTPUT_BYTES:
+                    overflow.set()
+                    _kill_process_group(proc)
+                    return
+                buffer += chunk
+        except (OSError, ValueError):
+            # The pipe was closed under us by _close_pipes
+            pass
+
+
+def _feed_stdin(stream, data: bytes) -> None:
+    """Write the input and close stdin; a program may exit without reading it all."""
+    try:
+        stream.write(data)
+        stream.close()
+    except (OSError, ValueError):
+        pass
+
+
+def _close_pipes(proc: subprocess.Popen, threads: list[threading.Thread]) -> None:
+    """
+    Give the pipe threads (stdin, stdout, stderr order) a moment to finish,
+    then close our end of any pipe still in use. A process that left the
+    group (e.g. via setsid) can hold a pipe open indefinitely; closing the
+    raw file makes a blocked reader stop at its next read instead of
+    keeping the worker waiting.
+    """
+    deadline = time.perf_counter() + PIPE_CLOSE_TIMEOUT
+    for thread, stream in zip(threads, (proc.stdin, proc.stdout, proc.stderr)):
+        thread.join(max(0.0, deadline - time.perf_counter()))
+        if thread.is_alive():
+            with contextlib.suppress(OSError, ValueError):
+                stream.raw.close()
+
+
+def _decode_output(data: bytearray) -> str:
+    return data.decode("utf-8", "replace").replace("\r\n", "\n")
+
+
 def run_code_locally(
     code: str,
     language: str,
@@ -81,14 +286,12 @@ def run_code_locally(
     
     file_path = None
     try:
-        file_path = create_solution_file(code, language)
+        file_path, _ = create_solution_file(code, language)
         
         # Compile if needed
-        if config["compile_cmd"]:
-            compile_cmd = config["compile_cmd"].format(file=file_path)
+        if config["compile_argv"]:
             compile_result = subprocess.run(
-                compile_cmd,
-                shell=True,
+                config["compile_argv"](file_path),
                 capture_output=True,
                 text=True,
                 timeout=30
@@ -101,38 +304,53 @@ def run_code_locally(
                     error=f"Compilation error: {compile_result.stderr}"
                 )
         
-        # Run the code
-        run_cmd = config["run_cmd"].format(file=file_path)
+        # Run the code (no intermediate shell process)
+        run_argv = config["run_argv"](file_path)
         
         start_time = time.perf_counter()
+        # The program leads its own process group, so a timeout kills
+        # anything it spawned too instead of leaving orphans behind
+        proc = subprocess.Popen(
+            run_argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            **_NEW_PROCESS_GROUP
+        )
+        stdout, stderr = bytearray(), bytearray()
+        overflow = threading.Event()
+        readers = [
+            threading.Thread(target=_drain_capped, args=(proc.stdout, stdout, proc, overflow), daemon=True),
+            threading.Thread(target=_drain_capped, args=(proc.stderr, stderr, proc, overflow), daemon=True),
+        ]
+        writer = threading.Thread(target=_feed_stdin, args=(proc.stdin, input_data.encode()), daemon=True)
+        for thread in (writer, *readers):
+            thread.start()
+        
+        deadline = start_time + timeout_seconds
         try:
-            result = subprocess.run(
-                run_cmd,
-                shell=True,
-                input=input_data,
-                capture_output=True,
-                text=True,
-                timeout=timeout_seconds
-            )
+            proc.wait(timeout=timeout_seconds)
             end_time = time.perf_counter()
-            
-            execution_time = (end_time - start_time) * 1000  # Convert to ms
-            
-            if result.returncode != 0:
-                return ExecutionResult(
-                    output=result.stdout.strip(),
-                    execution_time_ms=execution_time,
-                    memory_used_mb=0,  # Can't easily measure without Docker
-                    error=result.stderr.strip() if result.stderr else "Runtime error"
-                )
-            
+            # Output may still be held open by processes the program started
+            for thread in readers:
+                thread.join(max(0.0, deadline - time.perf_counter()))
+            timed_out = any(thread.is_alive() for thread in readers)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+        if timed_out:
+            _kill_process_group(proc)
+            proc.wait()
+        _close_pipes(proc, [writer, *readers])
+        
+        if overflow.is_set():
             return ExecutionResult(
-                output=result.stdout.strip(),
-                execution_time_ms=execution_time,
-                memory_used_mb=0  # Would need psutil or Docker for accurate measurement
+                output="",
+                execution_time_ms=0,
+                memory_used_mb=0,
+                error="Output limit exceeded"
             )
-            
-        except subprocess.TimeoutExpired:
+        
+        if timed_out:
             return ExecutionResult(
                 output="",
                 execution_time_ms=timeout_seconds * 1000,
@@ -140,6 +358,23 @@ def run_code_locally(
                 error="Time limit exceeded",
                 timed_out=True
             )
+        
+        execution_time = (end_time - start_time) * 1000  # Convert to ms
+        output = _decode_output(stdout).strip()
+        
+        if proc.returncode != 0:
+            return ExecutionResult(
+                output=output,
+                execution_time_ms=execution_time,
+                memory_used_mb=0,  # Can't easily measure without Docker
+                error=_decode_output(stderr).strip() or "Runtime error"
+            )
+        
+        return ExecutionResult(
+            output=output,
+            execution_time_ms=execution_time,
+            memory_used_mb=0  # Would need psutil or Docker for accurate measurement
+        )
     
     except Exception as e:
         return ExecutionResult(
@@ -150,8 +385,53 @@ def run_code_locally(
         )
     
     finally:
-        if file_path and os.path.exists(file_path):
-            os.unlink(file_path)
+        _remove_files(file_path)
+
+
+def _split_stats(stderr: Optional[bytes]) -> tuple[Optional[bytes], Optional[tuple[float, float]]]:
+    """
+    Separate the measure script's trailing stats line from the program's
+    stderr. Returns (stderr, (time ms, peak memory MB) or None).
+    """
+    if not stderr:
+        return stderr, None
+    head, marker, tail = stderr.rpartition(_STATS_MARKER.encode())
+    if not marker:
+        return stderr, None
+    try:
+        seconds, peak_kb = tail.split()
+        return head, (float(seconds) * 1000, int(peak_kb) / 1024)
+    except ValueError:
+        return stderr, None
+
+
+def _error_detail(stderr: Optional[bytes], exit_code: int) -> str:
+    """The program's stderr, or its exit code if it printed nothing."""
+    detail = stderr.decode("utf-8", "replace").strip() if stderr else ""
+    return detail or f"exit code {exit_code}"
+
+
+def _exec_capped(client, container, cmd: list[str]) -> tuple[int | None, bytes, bytes]:
+    """
+    Run cmd in the container, reading stdout and stderr as they arrive.
+    Returns (exit code, stdout, stderr); the exit code is None if either
+    stream passed MAX_OUTPUT_BYTES and reading stopped early.
+    """
+    exec_id = client.api.exec_create(container.id, cmd, workdir="/tmp")["Id"]
+    stream = client.api.exec_start(exec_id, stream=True, demux=True)
+    stdout, stderr = bytearray(), bytearray()
+    try:
+        # demux yields (stdout, stderr) pairs with None for the idle stream
+        for out_chunk, err_chunk in stream:
+            if out_chunk:
+                stdout += out_chunk
+            if err_chunk:
+                stderr += err_chunk
+            if len(stdout) > MAX_OUTPUT_BYTES or len(stderr) > MAX_OUTPUT_BYTES:
+                return None, b"", b""
+    finally:
+        stream.close()
+    return client.api.exec_inspect(exec_id)["ExitCode"], bytes(stdout), bytes(stderr)
 
 
 def run_code_docker(
@@ -163,13 +443,11 @@ def run_code_docker(
 ) -> ExecutionResult:
     """
     Run code in a Docker container for secure sandboxing.
+    Each run is an exec inside a warm container from the pool rather than a
+    fresh container, so startup cost is paid once per container, not per testcase.
     """
-    try:
-        import docker
-        client = docker.from_env(timeout=2, version='auto')  # Add timeout and auto-version to prevent hanging
-        # Quick ping to verify Docker is actually running
-        client.ping()
-    except Exception as e:
+    client = _get_docker_client()
+    if client is None:
         # Docker not available, fall back to local execution (this is normal on dev machines)
         return run_code_locally(code, language, input_data, timeout_seconds, memory_limit_mb)
     
@@ -186,73 +464,103 @@ def run_code_docker(
     
     file_path = None
     input_file_path = None
+    pool = None
+    container = None
+    reuse_container = True
     try:
-        # Create temp file with code
-        file_path = create_solution_file(code, language)
+        # Write the code and its input side by side in the mounted directory
+        file_path, input_file_path = create_solution_file(code, language, input_data)
         file_name = os.path.basename(file_path)
-        temp_dir = os.path.dirname(file_path)
-        
-        # Write input data to a file in the same temp directory
-        input_file_path = os.path.join(temp_dir, "input.txt")
-        with open(input_file_path, 'w', encoding='utf-8') as f:
-            f.write(input_data)
-        
-        # Convert Windows path to Docker-compatible path if needed
-        if sys.platform == "win32":
-            # Docker on Windows needs forward slashes and drive letter format like /c/Users/...
-            temp_dir_docker = temp_dir.replace("\\", "/")
-            if len(temp_dir_docker) >= 2 and temp_dir_docker[1] == ":":
-                temp_dir_docker = "/" + temp_dir_docker[0].lower() + temp_dir_docker[2:]
-            # Handle WSL paths if present
-            temp_dir_docker = temp_dir_docker.replace("C:/", "/mnt/c/").replace("D:/", "/mnt/d/")
-        else:
-            temp_dir_docker = temp_dir
         
         # Build the command to run inside container
-        if config["compile_cmd"]:
-            compile_part = config["compile_cmd"].format(file=f"/code/{file_name}") + " && "
+        if config["compile_argv"]:
+            compile_part = shlex.join(config["compile_argv"](f"/code/{file_name}")) + " && "
         else:
             compile_part = ""
         
-        run_part = config["run_cmd"].format(file=f"/code/{file_name}")
-        # Use echo to pipe input data directly or cat from input file
-        full_command = f"echo '{input_data}' | {run_part}"
+        run_part = shlex.join(
+            config.get("measure_cmd", []) + config["run_argv"](f"/code/{file_name}")
+        )
+        # stdin comes straight from the input file in the mount; the input itself
+        # never passes through the shell, so quotes and newlines are preserved
+        input_name = os.path.basename(input_file_path)
+        full_command = f"{compile_part}{run_part} < {shlex.quote(f'/code/{input_name}')}"
+        
+        # The container outlives the run, so the time limit is enforced inside it
+        exec_command = ["timeout", "-s", "KILL", str(timeout_seconds), "sh", "-c", full_command]
+        
+        pool = get_pool(client, config["image"], DOCKER_MOUNT_DIR)
+        container = pool.acquire()
         
         start_time = time.perf_counter()
         
-        # Run container
-        container = client.containers.run(
-            config["image"],
-            command=["sh", "-c", full_command],
-            volumes={temp_dir_docker: {"bind": "/code", "mode": "ro"}},
-            mem_limit=f"{memory_limit_mb}m",
-            network_disabled=True,
-            remove=True,
-            detach=False,
-            stdout=True,
-            stderr=True,
-        )
+        exit_code, stdout, stderr = _exec_capped(client, container, exec_command)
         
         end_time = time.perf_counter()
+        # Host-side time includes the exec round-trip; it only decides timeouts
         execution_time = (end_time - start_time) * 1000
         
-        output = container.decode("utf-8").strip() if isinstance(container, bytes) else str(container).strip()
+        if exit_code is None:
+            # The program is still running; removing the container stops it
+            reuse_container = False
+            return ExecutionResult(
+                output="",
+                execution_time_ms=0,
+                memory_used_mb=0,
+                error="Output limit exceeded"
+            )
+        
+        output = stdout.decode("utf-8", "replace").strip()
+        stderr, stats = _split_stats(stderr)
+        
+        if exit_code == 137:
+            # SIGKILL from timeout (or the OOM killer); child processes may
+            # survive the kill, so don't hand this container to another run
+            reuse_container = False
+            if execution_time >= timeout_seconds * 1000:
+                return ExecutionResult(
+                    output="",
+                    execution_time_ms=timeout_seconds * 1000,
+                    memory_used_mb=0,
+                    error="Time limit exceeded",
+                    timed_out=True
+                )
+        
+        if exit_code != 0:
+            return ExecutionResult(
+                output="",
+                execution_time_ms=0,
+                memory_used_mb=0,
+                error=f"Runtime error: {_error_detail(stderr, exit_code)}"
+            )
+        
+        if stats is None:
+            # No measurement available; fall back to host timing
+            return ExecutionResult(
+                output=output,
+                execution_time_ms=execution_time,
+                memory_used_mb=memory_limit_mb * 0.5  # Approximate
+            )
+        
+        program_time_ms, peak_memory_mb = stats
+        # The container's cgroup limit is the configured maximum; a lower
+        # per-request limit is enforced on the measured peak
+        if peak_memory_mb > memory_limit_mb:
+            return ExecutionResult(
+                output="",
+                execution_time_ms=program_time_ms,
+                memory_used_mb=peak_memory_mb,
+                error="Memory limit exceeded"
+            )
         
         return ExecutionResult(
             output=output,
-            execution_time_ms=execution_time,
-            memory_used_mb=memory_limit_mb * 0.5  # Approximate
-        )
-    
-    except docker.errors.ContainerError as e:
-        return ExecutionResult(
-            output="",
-            execution_time_ms=0,
-            memory_used_mb=0,
-            error=f"Runtime error: {e.stderr.decode() if e.stderr else str(e)}"
+            execution_time_ms=program_time_ms,
+            memory_used_mb=peak_memory_mb
         )
     
     except Exception as e:
+        reuse_container = False
         return ExecutionResult(
             output="",
             execution_time_ms=0,
@@ -261,10 +569,14 @@ def run_code_docker(
         )
     
     finally:
-        if file_path and os.path.exists(file_path):
-            os.unlink(file_path)
-        if input_file_path and os.path.exists(input_file_path):
-            os.unlink(input_file_path)
+        if container is not None:
+            pool.release(container, reuse=reuse_container)
+        _remove_files(file_path, input_file_path)
+
+
+# First characters json.loads accepts a document starting with (after stripping),
+# including its NaN and Infinity extensions
+_JSON_START_CHARS = frozenset('{["-0123456789tfnNI')
 
 
 def execute_testcase(
@@ -283,17 +595,21 @@ def execute_testcase(
     
     # Compare output (normalize whitespace)
     actual = result.output.strip()
-    expected = testcase.expected_output.strip()
+    expected, expected_is_json, obj_expected = testcase.parsed_expected
     
-    # Try semantic JSON comparison first
-    try:
-        import json
-        obj_actual = json.loads(actual)
-        obj_expected = json.loads(expected)
-        passed = obj_actual == obj_expected
-    except:
-        # Fallback to string comparison
-        passed = actual == expected
+    # Exact matches need no parsing; otherwise compare as JSON when both
+    # sides can be JSON, so formatting differences (spacing, key order) pass
+    if actual == expected:
+        passed = True
+    elif expected_is_json and actual and actual[0] in _JSON_START_CHARS:
+        # Uncached, unlike expected outputs: actual outputs rarely repeat,
+        # can be large, and would push expected values out of that cache
+        try:
+            passed = json.loads(actual) == obj_expected
+        except (ValueError, RecursionError):
+            passed = False
+    else:
+        passed = False
     
     return TestcaseResult(
         testcase_index=testcase_index,
@@ -304,3 +620,41 @@ def execute_testcase(
         memory_used_mb=result.memory_used_mb,
         error=result.error
     )
+
+
+# Caps concurrent sandbox runs across all requests so Docker isn't overloaded;
+# one warm container per slot
+MAX_CONCURRENT_TESTCASES = POOL_SIZE
+_testcase_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TESTCASES)
+
+
+async def execute_testcase_async(**kwargs) -> TestcaseResult:
+    """Run execute_testcase in a worker thread, bounded by the shared semaphore."""
+    async with _testcase_semaphore:
+        return await asyncio.to_thread(execute_testcase, **kwargs)
+
+
+async def execute_all_testcases(
+    code: str,
+    language: str,
+    testcases: list[TestcaseInput],
+    timeout_seconds: int = 10,
+    memory_limit_mb: int = 256,
+    use_docker: bool = True
+) -> list[TestcaseResult]:
+    """
+    Run every testcase concurrently (each in its own warm container, up to
+    the shared limit) and return the results in testcase order.
+    """
+    return await asyncio.gather(*(
+        execute_testcase_async(
+            code=code,
+            language=language,
+            testcase=testcase,
+            testcase_index=i,
+            timeout_seconds=timeout_seconds,
+            memory_limit_mb=memory_limit_mb,
+            use_docker=use_docker
+        )
+        for i, testcase in enumerate(testcases)
+    ))
@@ -0,0 +1,190 @@
+"""
+Pool of warm Docker containers for the sandbox.
+Starting a container costs far more than running a typical solution, so idle
+containers are kept running and each testcase is an exec inside one of them.
+"""
+
+import os
+import queue
+import threading
+
+from app.config import get_settings
+
+
+# Warm containers per (image, mount). Matches the sandbox's cap on
+# concurrent testcases, so a full batch never waits for a container to start.
+POOL_SIZE = min((os.cpu_count() or 1) * 2, 8)
+MAX_USES = 50  # recycle a container after this many runs
+ACQUIRE_TIMEOUT = 30.0  # seconds to wait for a free container
+# Scratch space for submissions: the root filesystem is read-only, so any
+# writes land in memory instead of going through the overlay's copy-on-write.
+# The tmpfs (like the process table) lives as long as the container, not the
+# run; RESET_COMMAND is what keeps runs apart.
+SCRATCH_TMPFS = {"/tmp": "rw,size=64m,noexec"}
+# Run between uses, because the next run may be another user's. kill -1 reaches
+# every process but PID 1 and the shell itself, so daemons a submission left
+# behind can't read later runs' files; then the writable mounts are wiped.
+# Killed orphans stay as zombies under `sleep` until the container is recycled.
+RESET_COMMAND = ["sh", "-c", "kill -9 -1 2>/dev/null; find /tmp /dev/shm -mindepth 1 -delete"]
+# Set on every pool container (value: the image) so ones left running by a
+# crashed or killed process can be found and removed on the next startup.
+POOL_LABEL = "codetest.pool"
+
+
+class ContainerPool:
+    """Warm containers for one image, memory limit and read-only /code mount."""
+
+    def __init__(self, client, image: str, memory_limit_mb: int, mount_dir: str, size: int = POOL_SIZE):
+        self.client = client
+        self.image = image
+        self.memory_limit_mb = memory_limit_mb
+        self.mount_dir = mount_dir
+        self.size = size
+        self._idle: queue.Queue = queue.Queue()
+        self._uses: dict[str, int] = {}
+        self._created = 0
+        self._containers: dict[str, object] = {}  # every live container, idle or checked out
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _start(self):
+        """
+        Start an idle container that just sleeps until code is exec'd in it.
+        Its namespaces (no network) are set up once and shared by every run.
+        """
+        container = self.client.containers.run(
+            self.image,
+            command=["sleep", "infinity"],
+            labels={POOL_LABEL: self.image},
+            volumes={self.mount_dir: {"bind": "/code", "mode": "ro"}},
+            mem_limit=f"{self.memory_limit_mb}m",
+            network_mode="none",
+            read_only=True,
+            tmpfs=SCRATCH_TMPFS,
+            detach=True,
+        )
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._containers[container.id] = container
+        if closed:  # shut down while it was starting
+            _remove(container)
+            raise RuntimeError("Sandbox is shutting down")
+        return container
+
+    def acquire(self):
+        """Check out a container, starting one if the pool isn't full yet."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_start = self._created < self.size
+            if can_start:
+                self._created += 1
+
+        if can_start:
+            try:
+                return self._start()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            raise RuntimeError("No sandbox container available, try again shortly")
+
+    def release(self, container, reuse: bool = True) -> None:
+        """
+        Return a container to the pool, reset for the next run. Pass
+        reuse=False when the container may be unhealthy (e.g. after a timeout
+        or an error); it is then replaced.
+        """
+        uses = self._uses.get(container.id, 0) + 1
+        if reuse and not self._closed and uses < MAX_USES and self._reset(container):
+            self._uses[container.id] = uses
+            self._idle.put(container)
+        else:
+            self._discard(container)
+
+    def _reset(self, container) -> bool:
+        """Clear what the last run left in the container; False if that failed."""
+        try:
+            return container.exec_run(RESET_COMMAND).exit_code == 0
+        except Exception as e:
+            print(f"Failed to reset sandbox container {container.id}: {e}")
+            return False
+
+    def _discard(self, container) -> None:
+        self._uses.pop(container.id, None)
+        with self._lock:
+            self._created -= 1
+            tracked = self._containers.pop(container.id, None) is not None
+        if tracked:  # close() may already have removed it
+            _remove(container)
+
+    def close(self) -> None:
+        """
+        Remove every container, including ones still checked out: their runs
+        fail, and release() then just drops them.
+        """
+        with self._lock:
+            self._closed = True
+            containers = list(self._containers.values())
+            self._containers.clear()
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for container in containers:
+            _remove(container)
+
+
+def _remove(container) -> None:
+    try:
+        container.remove(force=True)
+    except Exception as e:
+        print(f"Failed to remove sandbox container {container.id}: {e}")
+
+
+def remove_stale_containers(client) -> None:
+    """
+    Remove pool containers left behind by an earlier process that never got
+    to shut down. Call before the first pool is created: only the API process
+    runs the sandbox, so any labelled container at startup is an orphan.
+    """
+    for container in client.containers.list(all=True, filters={"label": POOL_LABEL}):
+        print(f"Removing stale sandbox container {container.id}")
+        _remove(container)
+
+
+_POOLS: dict[tuple[str, str], ContainerPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(client, image: str, mount_dir: str) -> ContainerPool:
+    """
+    Shared pool for an (image, mount) combination. Containers get the
+    configured maximum memory limit; the per-run limit is checked by the
+    caller, so requests with different limits share one pool.
+    """
+    key = (image, mount_dir)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            memory_limit_mb = get_settings().code_memory_limit_mb
+            pool = _POOLS[key] = ContainerPool(client, image, memory_limit_mb, mount_dir)
+        return pool
+
+
+def shutdown_pools() -> None:
+    """Remove every warm container (called on application shutdown)."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
@@ -61,24 +61,26 @@ def calculate_score(
     
     # Base score calculation
     base_score = pass_rate * question_points
+    five_pct = base_score * 0.05
+    ten_pct = base_score * 0.10
     
     # Time bonus (only if passed at least 50%)
     time_bonus = 0
     if pass_rate >= 0.5 and execution_time_ms > 0:
         if execution_time_ms < average_time_ms:
-            time_bonus = base_score * 0.05  # 5% bonus
+            time_bonus = five_pct  # 5% bonus
     
     # Memory efficiency bonus
     memory_bonus = 0
     if pass_rate >= 0.5 and memory_used_mb > 0:
         if memory_used_mb < average_memory_mb:
-            memory_bonus = base_score * 0.05  # 5% bonus
+            memory_bonus = five_pct  # 5% bonus
     
     # Penalty for failed testcases after 50% pass rate
     penalty = 0
     if pass_rate > 0.5:
         failed_after_50 = total_testcases - testcases_passed
-        penalty = min(failed_after_50 * (base_score * 0.10), base_score * 0.3)  # Cap at 30%
+        penalty = min(failed_after_50, 3) * ten_pct  # Cap at 30%
     
     # Calculate final score
     final_score = base_score + time_bonus + memory_bonus - penalty
@@ -120,6 +122,12 @@ def combine_scores(
     Returns:
         Combined final score
     """
+    # Single-source weightings skip the other product
+    if ai_weight == 0:
+        return round(rule_based_score * rule_weight, 2)
+    if rule_weight == 0:
+        return round(ai_score * 10 * ai_weight, 2)
+    
     # Normalize AI score to 100 scale
     normalized_ai = ai_score * 10
     
@@ -0,0 +1,40 @@
+"""
+arq worker for AI evaluation jobs.
+Run with: arq app.worker.WorkerSettings (requires REDIS_URL).
+"""
+
+from arq.connections import RedisSettings
+from supabase import create_client
+
+from app.config import get_settings
+from app.routers.submission import run_evaluation_task
+from app.services import groq_client
+from app.services.cache import get_cache
+
+
+settings = get_settings()
+
+
+async def startup(ctx: dict) -> None:
+    """Create the clients shared by every job in this worker."""
+    ctx["supabase"] = create_client(settings.supabase_url, settings.supabase_service_key)
+    ctx["cache"] = get_cache(settings)
+
+
+async def shutdown(ctx: dict) -> None:
+    await ctx["cache"].close()
+    await groq_client.close_client()
+
+
+async def run_evaluation(ctx: dict, **kwargs) -> None:
+    """AI evaluation for one submission; kwargs are those of run_evaluation_task."""
+    await run_evaluation_task(supabase=ctx["supabase"], cache=ctx["cache"], **kwargs)
+
+
+class WorkerSettings:
+    functions = [run_evaluation]
+    on_startup = startup
+    on_shutdown = shutdown
+    redis_settings = RedisSettings.from_dsn(settings.redis_url or "redis://localhost:6379")
+    max_jobs = 10
+    job_timeout = 120  # seconds; LLM calls are the slow part
@@ -0,0 +1,8 @@
+-- Run this in Supabase SQL Editor to speed up leaderboard reads
+
+-- The leaderboard view computes rank with ROW_NUMBER(), so it cannot be indexed
+-- directly. This partial index covers the view's filter (status = 'submitted'),
+-- its PARTITION BY test_id and the submitted_at tiebreaker.
+CREATE INDEX IF NOT EXISTS idx_participants_test_submitted
+  ON public.participants(test_id, submitted_at)
+  WHERE status = 'submitted';
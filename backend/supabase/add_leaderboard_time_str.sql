@@ -0,0 +1,27 @@
+-- Run this in Supabase SQL Editor to add the pre-formatted time_taken_str
+-- column to the leaderboard view (the API no longer parses intervals)
+
+CREATE OR REPLACE VIEW public.leaderboard AS
+SELECT 
+    ROW_NUMBER() OVER (
+        PARTITION BY p.test_id 
+        ORDER BY COALESCE(SUM(s.final_score), 0) DESC, 
+                 p.submitted_at ASC NULLS LAST
+    ) as rank,
+    p.test_id,
+    p.id as participant_id,
+    u.id as user_id,
+    u.full_name as student_name,
+    COALESCE(SUM(s.final_score), 0) as total_score,
+    COALESCE(SUM(s.testcases_passed), 0) as total_testcases_passed,
+    COALESCE(SUM(s.total_testcases), 0) as total_testcases,
+    p.submitted_at - p.started_at as time_taken,
+    p.submitted_at,
+    -- "HH:MM:SS"; make_interval keeps everything in the hours field, so
+    -- attempts longer than a day show e.g. 26:03:04 rather than wrapping
+    to_char(make_interval(secs => floor(EXTRACT(EPOCH FROM p.submitted_at - p.started_at))), 'HH24:MI:SS') as time_taken_str
+FROM public.participants p
+JOIN public.users u ON p.user_id = u.id
+LEFT JOIN public.submissions s ON s.participant_id = p.id
+WHERE p.status = 'submitted'
+GROUP BY p.test_id, p.id, u.id, u.full_name, p.submitted_at, p.started_at;
@@ -118,7 +118,9 @@ SELECT
     COALESCE(SUM(s.testcases_passed), 0) as total_testcases_passed,
     COALESCE(SUM(s.total_testcases), 0) as total_testcases,
     p.submitted_at - p.started_at as time_taken,
-    p.submitted_at
+    p.submitted_at,
+    -- Pre-formatted "HH:MM:SS" (hours may exceed 24) so the API needn't parse intervals
+    to_char(make_interval(secs => floor(EXTRACT(EPOCH FROM p.submitted_at - p.started_at))), 'HH24:MI:SS') as time_taken_str
 FROM public.participants p
 JOIN public.users u ON p.user_id = u.id
 LEFT JOIN public.submissions s ON s.participant_id = p.id
@@ -135,6 +137,7 @@ CREATE INDEX idx_tests_status ON public.tests(status);
 CREATE INDEX idx_questions_test ON public.questions(test_id);
 CREATE INDEX idx_testcases_question ON public.testcases(question_id);
 CREATE INDEX idx_participants_test ON public.participants(test_id);
+CREATE INDEX idx_participants_test_submitted ON public.participants(test_id, submitted_at) WHERE status = 'submitted';
 CREATE INDEX idx_participants_user ON public.participants(user_id);
 CREATE INDEX idx_submissions_participant ON public.submissions(participant_id);
 CREATE INDEX idx_submissions_question ON public.submissions(question_id);
@@ -0,0 +1,5 @@
+import os
+
+# Settings are read at import time by several modules; the tests never reach these services
+for _name in ("SUPABASE_URL", "SUPABASE_KEY", "SUPABASE_SERVICE_KEY", "SUPABASE_JWT_SECRET", "GROQ_API_KEY"):
+    os.environ.setdefault(_name, "http://localhost" if _name == "SUPABASE_URL" else "test")
@@ -0,0 +1,78 @@
+"""
+Tests for validation of generated Python starter/driver code.
+Run from backend/: python -m unittest
+"""
+
+import unittest
+
+from app.services.ai_generator import validate_python_code
+
+
+STARTER = "def solve(nums):\n    pass\n"
+
+
+def _validate(driver: str) -> None:
+    validate_python_code({"starter_code": STARTER, "driver_code": driver})
+
+
+class DriverValidationTest(unittest.TestCase):
+    def test_accepts_comprehension_parsing_input(self):
+        _validate(
+            "import sys\n"
+            "nums = [int(x) for x in sys.stdin.read().split()]\n"
+            "print(solve(nums))\n"
+        )
+
+    def test_accepts_generator_formatting_output(self):
+        _validate(
+            "nums = list(map(int, input().split()))\n"
+            "res = solve(nums)\n"
+            "print(' '.join(str(x) for x in res))\n"
+        )
+
+    def test_accepts_grid_parsed_per_line(self):
+        _validate(
+            "import sys\n"
+            "grid = [[int(x) for x in line.split()] for line in sys.stdin.read().splitlines()]\n"
+            "print(solve(grid))\n"
+        )
+
+    def test_rejects_index_loop(self):
+        with self.assertRaises(ValueError):
+            _validate(
+                "nums = list(map(int, input().split()))\n"
+                "total = 0\n"
+                "for i in range(len(nums)):\n"
+                "    total += nums[i]\n"
+                "print(solve(nums), total)\n"
+            )
+
+    def test_rejects_comprehension_over_range(self):
+        with self.assertRaises(ValueError):
+            _validate(
+                "nums = list(map(int, input().split()))\n"
+                "pairs = [nums[i] + nums[i + 1] for i in range(len(nums) - 1)]\n"
+                "print(solve(pairs))\n"
+            )
+
+    def test_rejects_nested_comprehension(self):
+        with self.assertRaises(ValueError):
+            _validate(
+                "nums = list(map(int, input().split()))\n"
+                "sums = [[a + b for b in nums] for a in nums]\n"
+                "print(solve(sums))\n"
+            )
+
+    def test_rejects_binary_search_loop(self):
+        with self.assertRaises(ValueError):
+            _validate(
+                "nums = list(map(int, input().split()))\n"
+                "lo, hi = 0, len(nums)\n"
+                "while lo < hi:\n"
+                "    hi -= 1\n"
+                "print(solve(nums))\n"
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
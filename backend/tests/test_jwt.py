@@ -0,0 +1,50 @@
+"""
+Tests for Supabase JWT verification.
+Run from backend/: python -m unittest
+"""
+
+import time
+import unittest
+
+import jwt as pyjwt
+
+from app.auth import jwt as jwt_auth
+from app.auth.jwt import JWTError, verify_supabase_jwt
+
+
+SECRET = "test-secret-at-least-32-bytes-long!"
+
+
+def _token(**claims) -> str:
+    now = int(time.time())
+    payload = {"sub": "user-1", "iat": now, "exp": now + 3600, **claims}
+    return pyjwt.encode(payload, SECRET, algorithm="HS256")
+
+
+class VerifySupabaseJwtTest(unittest.TestCase):
+    def setUp(self):
+        # Verified payloads are cached by token; start each test cold
+        jwt_auth._JWT_CACHE.clear()
+
+    def test_accepts_valid_token(self):
+        payload = verify_supabase_jwt(_token(), SECRET, "http://localhost")
+        self.assertEqual(payload["sub"], "user-1")
+
+    def test_accepts_iat_slightly_in_the_future(self):
+        # Supabase's clock may run a little ahead of this server's
+        token = _token(iat=int(time.time()) + 30)
+        payload = verify_supabase_jwt(token, SECRET, "http://localhost")
+        self.assertEqual(payload["sub"], "user-1")
+
+    def test_rejects_expired_token(self):
+        now = int(time.time())
+        with self.assertRaises(JWTError):
+            verify_supabase_jwt(_token(iat=now - 7200, exp=now - 3600), SECRET, "http://localhost")
+
+    def test_rejects_wrong_secret(self):
+        with self.assertRaises(JWTError):
+            verify_supabase_jwt(_token(), "another-secret-at-least-32-bytes!", "http://localhost")
+
+
+if __name__ == "__main__":
+    unittest.main()